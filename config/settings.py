@@ -3,18 +3,47 @@ Configuration file for Reddit Data Extraction with GPU acceleration
 """
 
 import os
+from collections import Counter
+
+def _parse_credentials(value: str) -> list:
+    """Parse "id:secret,id:secret" into credential dicts, rejecting malformed entries"""
+    credentials = []
+    for entry in value.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        client_id, sep, client_secret = (part.strip() for part in entry.partition(':'))
+        if not sep or not client_id or not client_secret:
+            raise ValueError(f"REDDIT_CREDENTIALS entry {entry.split(':', 1)[0]!r} is not in id:secret form")
+        credentials.append({'client_id': client_id, 'client_secret': client_secret})
+    return credentials
 
 # Reddit API Configuration
 REDDIT_CONFIG = {
     'client_id': os.getenv('REDDIT_CLIENT_ID', 'your_client_id_here'),
     'client_secret': os.getenv('REDDIT_CLIENT_SECRET', 'your_client_secret_here'),
     'user_agent': 'AuraChat:v2.0:empathy_research (by u/your_username)',
+    'oauth_url': 'https://oauth.reddit.com',
+    'token_url': 'https://www.reddit.com/api/v1/access_token',
+    # Optional pool of app credentials as "id:secret,id:secret"; each brings its own
+    # token and rate limit, and subreddits are sharded across them
+    'credentials': _parse_credentials(os.getenv('REDDIT_CREDENTIALS', '')),
     'username': os.getenv('REDDIT_USERNAME', ''),  # Optional for read-only
     'password': os.getenv('REDDIT_PASSWORD', '')   # Optional for read-only
 }
 
+# Pushshift-compatible archive for bulk historical fetches (e.g. PullPush)
+PUSHSHIFT_CONFIG = {
+    'base_url': os.getenv('PUSHSHIFT_BASE_URL', 'https://api.pullpush.io'),
+    'page_size': 500,                  # Objects per bulk request
+    'comment_batch_size': 100,         # Post ids per comment request
+    'fresh_content_hours': 24,         # Newer posts are fetched from the Reddit API
+    'rate_limit_requests': 15,         # Requests allowed per window (PullPush soft limit)
+    'rate_limit_window': 60,           # Rate limit window (seconds)
+}
+
 # Empathetic Subreddits for extraction
-EMPATHETIC_SUBREDDITS = [
+_EMPATHETIC_SUBREDDITS = [
     # Support and advice communities
     'relationship_advice',
     'offmychest',
@@ -68,11 +97,20 @@ EMPATHETIC_SUBREDDITS = [
     'RandomKindness'
 ]
 
+# Each entry is a full extraction job, so a repeat (subreddit names are case-insensitive)
+# is rejected at import rather than extracted twice; the list is frozen as a tuple
+_duplicate_subreddits = sorted(name for name, count in Counter(name.lower() for name in _EMPATHETIC_SUBREDDITS).items()
+                               if count > 1)
+if _duplicate_subreddits:
+    raise ValueError(f"Duplicate subreddits in _EMPATHETIC_SUBREDDITS: {', '.join(_duplicate_subreddits)}")
+EMPATHETIC_SUBREDDITS: tuple = tuple(_EMPATHETIC_SUBREDDITS)
+
 # GPU-Accelerated Data Processing Configuration
 DATA_CONFIG = {
     # Extraction parameters
     'posts_per_subreddit': 500,        # Increased for larger dataset
     'max_comments_per_post': 20,       # More comments per post
+    'max_pairs_per_post': 10,          # Stop pairing a post's comments once this many are found
     'min_comment_length': 20,          # Minimum comment length
     'max_comment_length': 2000,        # Maximum comment length
     'min_post_score': 5,               # Minimum post score
@@ -80,12 +118,15 @@ DATA_CONFIG = {
     
     # Batch processing for GPU acceleration
     'batch_size': 50,                  # Process 50 subreddits at once
-    'parallel_workers': 8,             # Parallel API requests
+    'parallel_workers': 8,             # Parallel API requests (capped at max_connections_per_host)
+    'max_connections_per_host': 16,    # One host's quota is shared, so more sockets only queue
     'gpu_batch_size': 128,             # GPU processing batch size
     'max_sequence_length': 512,        # Max tokens per sequence
     
     # Rate limiting
-    'rate_limit_delay': 1.0,           # Delay between requests (seconds)
+    'rate_limit_requests': 600,        # Requests allowed per window (Reddit OAuth quota)
+    'rate_limit_window': 600,          # Rate limit window (seconds)
+    'rate_limit_reserve': 10,          # Start pacing when this few requests remain
     'api_timeout': 30,                 # API request timeout
     'retry_attempts': 3,               # Retry failed requests
     'backoff_factor': 2,               # Exponential backoff
@@ -97,12 +138,21 @@ DATA_CONFIG = {
         'difficult', 'hard time', 'going through', 'experience',
         'valid', 'normal', 'okay to', 'makes sense'
     ],
+    # Exemplar replies whose mean embedding is the empathetic reference
+    'empathy_references': [
+        "I'm so sorry you're going through this, that sounds really hard.",
+        "Your feelings are completely valid and it makes sense you feel this way.",
+        "I'm here for you if you ever need someone to listen.",
+        "It takes a lot of strength to share this. Be gentle with yourself.",
+        "I understand how difficult this must be, and you're not alone."
+    ],
     
     # Output configuration
     'output_format': 'jsonl',          # jsonl for large datasets
     'save_interval': 1000,             # Save every N conversations
     'compression': True,               # Compress output files
     'checkpoint_interval': 5000,       # Checkpoint every N records
+    'cache_size_limit': 20 << 30,      # On-disk fetch cache size (bytes)
 }
 
 # GPU Processing Configuration
@@ -113,6 +163,9 @@ GPU_CONFIG = {
     'pin_memory': True,                # Pin memory for faster GPU transfer
     'prefetch_factor': 2,              # Prefetch batches
     'persistent_workers': True,        # Keep workers alive between epochs
+    'empathy_model': 'sentence-transformers/all-MiniLM-L6-v2',  # None to use keyword matching
+    'empathy_threshold': 0.4,          # Min cosine similarity to the empathetic reference
+    'dedup_similarity': 0.95,          # Responses this similar to a kept one are dropped
 }
 
 # File paths
@@ -120,6 +173,7 @@ PATHS = {
     'raw_data': 'data/raw/',
     'processed_data': 'data/processed/',
     'checkpoints': 'data/checkpoints/',
+    'cache': 'data/cache/reddit/',
     'logs': 'logs/',
     'models': 'models/',
     'results': 'results/'
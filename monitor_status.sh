@@ -40,7 +40,7 @@ if [ -d "data/raw" ] && [ "$(ls -A data/raw 2>/dev/null)" ]; then
     
     echo ""
     echo "📊 Data Summary:"
-    BATCH_FILES=$(ls data/raw/batch_*.jsonl.gz 2>/dev/null | wc -l)
+    BATCH_FILES=$(ls data/raw/batch_*.jsonl.zst 2>/dev/null | wc -l)
     echo "Batch files: $BATCH_FILES"
     
     if [ $BATCH_FILES -gt 0 ]; then
@@ -49,9 +49,9 @@ if [ -d "data/raw" ] && [ "$(ls -A data/raw 2>/dev/null)" ]; then
         
         # Count conversations if possible
         echo "📈 Estimated conversations:"
-        for file in data/raw/batch_*.jsonl.gz; do
+        for file in data/raw/batch_*.jsonl.zst; do
             if [ -f "$file" ]; then
-                COUNT=$(zcat "$file" 2>/dev/null | wc -l)
+                COUNT=$(zstdcat "$file" 2>/dev/null | wc -l)
                 echo "  $(basename "$file"): $COUNT conversations"
                 break  # Just show first file as example
             fi
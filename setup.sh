@@ -58,7 +58,7 @@ fi
 echo "🧪 Testing imports..."
 .venv/bin/python -c "
 try:
-    import praw
+    import aiohttp
     import torch
     import pandas as pd
     import asyncio
@@ -3,18 +3,29 @@ AuraChat Data Processing Pipeline - Main Orchestrator
 Processes raw Reddit extraction data into training-ready empathy datasets
 """
 
+import io
 import json
 import gzip
 import argparse
 import logging
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Iterable, Iterator, Callable, Set, Union
 import multiprocessing as mp
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import queue
+import threading
+from collections import deque
+from itertools import groupby
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
 
 import pandas as pd
 import numpy as np
+import orjson
+import msgspec
+import xxhash
+import zstandard
+import pyarrow as pa
+import pyarrow.parquet as pq
 from tqdm import tqdm
 
 # Import pipeline stages
@@ -23,12 +34,179 @@ from stage2_empathy import EmpathyScorer
 from stage3_datasets import DatasetGenerator
 from stage4_model_prep import ModelPreparator
 
+def prefetch(iterable: Iterable[Any], max_prefetch: int = 2) -> Iterator[Any]:
+    """Yield items from `iterable` while a background thread produces the next ones"""
+    buffer = queue.Queue(maxsize=max_prefetch)
+    sentinel = object()
+    errors = []
+    
+    def producer():
+        try:
+            for item in iterable:
+                buffer.put(item)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            buffer.put(sentinel)
+    
+    threading.Thread(target=producer, daemon=True).start()
+    while (item := buffer.get()) is not sentinel:
+        yield item
+    if errors:
+        raise errors[0]
+
+def iter_batches(iterable: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    """Group items from `iterable` into lists of up to `batch_size`"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def submit_bounded(executor: Executor, fn: Callable, iterable: Iterable[Any],
+                   max_pending: int) -> Iterator[Tuple[Any, Future]]:
+    """Like Executor.map, but keeps at most `max_pending` tasks in flight
+    
+    Yields ``(item, future)`` in submission order so callers can handle failures per item.
+    """
+    pending = deque()
+    for item in iterable:
+        pending.append((item, executor.submit(fn, item)))
+        if len(pending) >= max_pending:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+def open_compressed(file_path: Path):
+    """Open a zstd (.zst) or gzip compressed file for binary reading"""
+    if file_path.suffix == '.zst':
+        return zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True)
+    return gzip.open(file_path, 'rb')
+
+def iter_jsonl(file_path: Path) -> Iterator[Dict[str, Any]]:
+    """Stream records from a compressed JSONL file, reading decompressed bytes in 1 MiB blocks"""
+    with io.BufferedReader(open_compressed(file_path), buffer_size=1 << 20) as f:
+        for line in f:
+            if line.strip():
+                yield orjson.loads(line)
+
+def write_jsonl(file_path: Path, records: Iterable[Dict[str, Any]], compresslevel: int = 9,
+                flush_bytes: int = 1 << 20) -> int:
+    """Write records as gzipped JSONL, encoding into one reused buffer
+    
+    A single msgspec encoder is reused for every record and output is handed to
+    gzip in ~1 MiB chunks rather than one write per line. Returns the record count.
+    """
+    encoder = msgspec.json.Encoder()
+    buffer = bytearray()
+    count = 0
+    
+    with gzip.open(file_path, 'wb', compresslevel=compresslevel) as f:
+        for record in records:
+            encoder.encode_into(record, buffer, -1)
+            buffer.extend(b'\n')
+            count += 1
+            if len(buffer) >= flush_bytes:
+                f.write(buffer)
+                buffer.clear()
+        f.write(buffer)
+    
+    return count
+
+def load_raw_file(file_path: Path) -> List[Dict[str, Any]]:
+    """Parse one compressed JSONL file"""
+    return list(iter_jsonl(file_path))
+
+# Per-process stage objects, built once by the pool initializer
+_CLEANER = None
+
+def _init_worker(config: Dict[str, Any]):
+    """Pool initializer: load the cleaner (and its spaCy model) once per worker"""
+    global _CLEANER
+    _CLEANER = DataCleaner(config)
+
+def _clean_batch(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Clean one batch with this worker's cleaner"""
+    return _CLEANER.clean_batch(batch)
+
+# Columnar layout of cleaned conversations: one row per empathy pair, keyed by conversation_id
+PAIR_SCHEMA = pa.schema([
+    ("conversation_id", pa.string()),
+    ("subreddit", pa.string()),
+    ("context", pa.string()),
+    ("post_title", pa.string()),
+    ("source_subreddit", pa.string()),
+    ("original_score", pa.int64()),
+    ("original_comment_count", pa.int64()),
+    ("extraction_timestamp", pa.string()),
+    ("processing_timestamp", pa.string()),
+    ("quality_flags", pa.list_(pa.string())),
+    ("input", pa.string()),
+    ("response", pa.string()),
+    ("empathy_score", pa.float64()),
+    ("quality_score", pa.float64()),
+    ("original_input_length", pa.int64()),
+    ("original_response_length", pa.int64()),
+    ("cleaned_input_length", pa.int64()),
+    ("cleaned_response_length", pa.int64()),
+])
+
+CONVERSATION_COLUMNS = ["conversation_id", "subreddit", "context", "post_title"]
+METADATA_COLUMNS = ["source_subreddit", "original_score", "original_comment_count",
+                    "extraction_timestamp", "processing_timestamp", "quality_flags"]
+PAIR_COLUMNS = ["input", "response", "empathy_score", "quality_score"]
+PAIR_METADATA_COLUMNS = ["original_input_length", "original_response_length",
+                         "cleaned_input_length", "cleaned_response_length"]
+
+def conversations_to_table(conversations: List[Dict[str, Any]]) -> pa.Table:
+    """Flatten cleaned conversations into a pair-per-row Arrow table"""
+    columns = {name: [] for name in PAIR_SCHEMA.names}
+    for conv in conversations:
+        metadata = conv["metadata"]
+        for pair in conv["empathy_pairs"]:
+            for name in CONVERSATION_COLUMNS:
+                columns[name].append(conv[name])
+            for name in METADATA_COLUMNS:
+                columns[name].append(metadata.get(name))
+            for name in PAIR_COLUMNS:
+                columns[name].append(pair[name])
+            for name in PAIR_METADATA_COLUMNS:
+                columns[name].append(pair["pair_metadata"][name])
+    return pa.table(columns, schema=PAIR_SCHEMA)
+
+def iter_parquet_conversations(file_path: Path) -> Iterator[Dict[str, Any]]:
+    """Stream conversations back out of a pair-per-row Parquet file
+    
+    Rows of one conversation are written contiguously, so consecutive rows are
+    grouped on conversation_id without materializing the whole table.
+    """
+    parquet_file = pq.ParquetFile(file_path, memory_map=True)
+    rows = (row for record_batch in parquet_file.iter_batches() for row in record_batch.to_pylist())
+    
+    for _, group in groupby(rows, key=lambda row: row["conversation_id"]):
+        pairs = list(group)
+        first = pairs[0]
+        conversation = {name: first[name] for name in CONVERSATION_COLUMNS}
+        conversation["empathy_pairs"] = [
+            {
+                **{name: pair[name] for name in PAIR_COLUMNS},
+                "pair_metadata": {name: pair[name] for name in PAIR_METADATA_COLUMNS}
+            }
+            for pair in pairs
+        ]
+        conversation["metadata"] = {name: first[name] for name in METADATA_COLUMNS}
+        yield conversation
+
 class DataProcessingPipeline:
     """Main data processing pipeline orchestrator"""
     
     def __init__(self, config_path: str = None):
         self.config = self._load_config(config_path)
         self.setup_logging()
+        self._pool = None
         
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         """Load processing configuration"""
@@ -38,6 +216,11 @@ class DataProcessingPipeline:
             "temp_dir": "data/temp/",
             "parallel_workers": mp.cpu_count() - 1,
             "batch_size": 1000,
+            "gpu_batch_size": 128,
+            "stage_queue_size": 1000,
+            "persist_dedup_hashes": False,
+            "intermediate_compression_level": 1,
+            "output_compression_level": 6,
             "quality_thresholds": {
                 "min_empathy_pairs": 2,
                 "min_post_score": 10,
@@ -76,87 +259,170 @@ class DataProcessingPipeline:
         )
         self.logger = logging.getLogger(__name__)
         
-    def load_raw_data(self) -> List[Dict[str, Any]]:
-        """Load all raw Reddit extraction files"""
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        """Worker pool shared by every stage, started on first use"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.config["parallel_workers"],
+                                             initializer=_init_worker, initargs=(self.config,))
+        return self._pool
+    
+    def shutdown_pool(self):
+        """Stop the shared worker pool"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+    
+    def load_raw_data(self) -> Iterator[List[Dict[str, Any]]]:
+        """Stream raw Reddit extraction files as batches of `batch_size` conversations"""
         input_dir = Path(self.config["input_dir"])
-        raw_files = list(input_dir.glob("batch_*.jsonl.gz"))
+        # Current extractor batches are zstd; older runs wrote gzip
+        raw_files = sorted([*input_dir.glob("batch_*.jsonl.zst"), *input_dir.glob("batch_*.jsonl.gz")])
         
         if not raw_files:
             raise FileNotFoundError(f"No batch files found in {input_dir}")
             
         self.logger.info(f"Found {len(raw_files)} raw data files")
+        return iter_batches(self._iter_raw_conversations(raw_files), self.config["batch_size"])
+    
+    def _iter_raw_conversations(self, raw_files: List[Path]) -> Iterator[Dict[str, Any]]:
+        """Yield raw conversations, parsing a bounded window of files in parallel"""
+        workers = self.config["parallel_workers"]
+        loaded = 0
         
-        all_conversations = []
-        for file_path in tqdm(raw_files, desc="Loading raw data"):
+        # Batch files are independent, so decompress and parse them in parallel
+        for file_path, future in tqdm(submit_bounded(self.pool, load_raw_file, raw_files, workers),
+                                      total=len(raw_files), desc="Loading raw data"):
             try:
-                with gzip.open(file_path, 'rt', encoding='utf-8') as f:
-                    for line in f:
-                        if line.strip():
-                            conversation = json.loads(line)
-                            all_conversations.append(conversation)
+                conversations = future.result()
             except Exception as e:
                 self.logger.error(f"Error loading {file_path}: {e}")
-                
-        self.logger.info(f"Loaded {len(all_conversations)} raw conversations")
-        return all_conversations
+                continue
+            loaded += len(conversations)
+            yield from conversations
+            
+        self.logger.info(f"Loaded {loaded} raw conversations")
     
-    def run_stage1_cleaning(self, raw_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Stage 1: Data validation and cleaning"""
+    def run_stage1_cleaning(self, raw_batches: Iterable[List[Dict[str, Any]]]) -> Path:
+        """Stage 1: Data validation and cleaning
+        
+        Batches are cleaned in parallel and written as they complete, so only the
+        batches in flight are held in memory. Returns the stage 1 output path.
+        """
+        deque(self.iter_stage1_cleaning(raw_batches), maxlen=0)
+        return Path(self.config["temp_dir"]) / "stage1_cleaned.parquet"
+    
+    def iter_stage1_cleaning(self, raw_batches: Iterable[List[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+        """Run stage 1, yielding each clean conversation once its batch is written"""
         self.logger.info("🧹 Starting Stage 1: Data Cleaning")
         
-        cleaner = DataCleaner(self.config)
+        workers = self.config["parallel_workers"]
         
-        # Process in parallel batches
-        batch_size = self.config["batch_size"]
-        batches = [raw_data[i:i + batch_size] for i in range(0, len(raw_data), batch_size)]
+        stage1_output = Path(self.config["temp_dir"]) / "stage1_cleaned.parquet"
+        stage1_output.parent.mkdir(parents=True, exist_ok=True)
         
-        cleaned_conversations = []
-        with ProcessPoolExecutor(max_workers=self.config["parallel_workers"]) as executor:
-            futures = [executor.submit(cleaner.clean_batch, batch) for batch in batches]
-            
-            for future in tqdm(as_completed(futures), total=len(futures), desc="Cleaning batches"):
+        cleaned_count = 0
+        # Workers clean with their own DataCleaner, so only the batch is pickled per task
+        with pq.ParquetWriter(stage1_output, PAIR_SCHEMA) as writer:
+            for _, future in tqdm(submit_bounded(self.pool, _clean_batch, raw_batches, 2 * workers),
+                                  desc="Cleaning batches"):
                 try:
                     batch_result = future.result()
-                    cleaned_conversations.extend(batch_result)
                 except Exception as e:
                     self.logger.error(f"Error in cleaning batch: {e}")
-        
-        # Save intermediate results
-        stage1_output = Path(self.config["temp_dir"]) / "stage1_cleaned.jsonl.gz"
-        stage1_output.parent.mkdir(parents=True, exist_ok=True)
-        
-        with gzip.open(stage1_output, 'wt', encoding='utf-8') as f:
-            for conv in cleaned_conversations:
-                f.write(json.dumps(conv) + '\n')
+                    continue
+                
+                # Each cleaned batch becomes one row group
+                if batch_result:
+                    writer.write_table(conversations_to_table(batch_result))
+                cleaned_count += len(batch_result)
+                yield from batch_result
                 
-        self.logger.info(f"✅ Stage 1 complete: {len(cleaned_conversations)} clean conversations")
-        return cleaned_conversations
+        self.logger.info(f"✅ Stage 1 complete: {cleaned_count} clean conversations")
     
-    def run_stage2_empathy(self, clean_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Stage 2: Empathy enhancement and scoring"""
+    def run_stage2_empathy(self, stage1_output: Union[Path, Iterable[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Stage 2: Empathy enhancement and scoring
+        
+        `stage1_output` is either the stage 1 Parquet file or a live stream of
+        clean conversations, so scoring can start while stage 1 is still running.
+        """
         self.logger.info("💝 Starting Stage 2: Empathy Scoring")
         
         scorer = EmpathyScorer(self.config)
+        # Resolved once, outside the error handling, so a scorer without a batch method
+        # is scored per conversation rather than failing every batch
+        score_batch = getattr(scorer, "score_batch", None)
+        
+        def score_each(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            """Score conversations one at a time, skipping only the ones that fail"""
+            scored = []
+            for conversation in batch:
+                try:
+                    scored.append(scorer.score_conversation(conversation))
+                except Exception as e:
+                    self.logger.error(f"Error scoring conversation {conversation.get('conversation_id', 'unknown')}: {e}")
+            return scored
+        
+        # Reposts and bot replies repeat the same responses; drop them before scoring
+        hash_file = Path(self.config["temp_dir"]) / "stage1_hashes.bin"
+        persist_hashes = self.config.get("persist_dedup_hashes", False)
+        seen = self.load_seen_hashes(hash_file) if persist_hashes else set()
+        known_hashes = len(seen)
+        if isinstance(stage1_output, Path):
+            stage1_output = iter_parquet_conversations(stage1_output)
+        conversations = self.deduplicate_pairs(stage1_output, seen)
+        
+        # Score in GPU-sized batches; the next batch is assembled while the current one is scored
+        batches = prefetch(iter_batches(conversations, self.config["gpu_batch_size"]))
         
-        # Process conversations for empathy scoring
         empathy_scored = []
-        for conversation in tqdm(clean_data, desc="Scoring empathy"):
-            try:
-                scored_conv = scorer.score_conversation(conversation)
-                if scored_conv:  # Only keep high-quality empathy conversations
-                    empathy_scored.append(scored_conv)
-            except Exception as e:
-                self.logger.error(f"Error scoring conversation {conversation.get('conversation_id', 'unknown')}: {e}")
+        with tqdm(desc="Scoring empathy", unit="conv") as progress:
+            for batch in batches:
+                if score_batch is None:
+                    scored_batch = score_each(batch)
+                else:
+                    try:
+                        scored_batch = score_batch(batch)
+                    except Exception as e:
+                        # One bad conversation must not cost the rest of its batch
+                        self.logger.warning(f"Batch scoring failed at {batch[0].get('conversation_id', 'unknown')}, "
+                                            f"rescoring one at a time: {e}")
+                        scored_batch = score_each(batch)
+                # Only keep high-quality empathy conversations
+                empathy_scored.extend(conv for conv in scored_batch if conv)
+                progress.update(len(batch))
+        
+        self.logger.info(f"🔁 Deduplication kept {len(seen) - known_hashes} unique responses")
+        if persist_hashes:
+            np.fromiter(seen, dtype=np.uint64, count=len(seen)).tofile(hash_file)
         
         # Save intermediate results
         stage2_output = Path(self.config["temp_dir"]) / "stage2_empathy_scored.jsonl.gz"
-        with gzip.open(stage2_output, 'wt', encoding='utf-8') as f:
-            for conv in empathy_scored:
-                f.write(json.dumps(conv) + '\n')
-                
+        write_jsonl(stage2_output, empathy_scored, compresslevel=self.config["intermediate_compression_level"])
+        
         self.logger.info(f"✅ Stage 2 complete: {len(empathy_scored)} empathy-scored conversations")
         return empathy_scored
     
+    def load_seen_hashes(self, hash_file: Path) -> Set[int]:
+        """Load response hashes persisted by a previous run"""
+        if not hash_file.exists():
+            return set()
+        return set(np.fromfile(hash_file, dtype=np.uint64).tolist())
+    
+    def deduplicate_pairs(self, conversations: Iterable[Dict[str, Any]], seen: Set[int]) -> Iterator[Dict[str, Any]]:
+        """Drop empathy pairs whose response text has already been seen"""
+        for conversation in conversations:
+            pairs = []
+            for pair in conversation["empathy_pairs"]:
+                digest = xxhash.xxh3_64_intdigest(pair["response"])
+                if digest not in seen:
+                    seen.add(digest)
+                    pairs.append(pair)
+            
+            if pairs:
+                conversation["empathy_pairs"] = pairs
+                yield conversation
+    
     def run_stage3_datasets(self, empathy_data: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
         """Stage 3: Dataset generation and splitting"""
         self.logger.info("📊 Starting Stage 3: Dataset Generation")
@@ -172,9 +438,7 @@ class DataProcessingPipeline:
         
         for split_name, split_data in datasets.items():
             split_file = output_dir / f"{split_name}_dataset.jsonl.gz"
-            with gzip.open(split_file, 'wt', encoding='utf-8') as f:
-                for item in split_data:
-                    f.write(json.dumps(item) + '\n')
+            write_jsonl(split_file, split_data, compresslevel=self.config["output_compression_level"])
             
             self.logger.info(f"💾 Saved {split_name}: {len(split_data)} examples")
         
@@ -208,20 +472,20 @@ class DataProcessingPipeline:
         
         # Calculate statistics for each split
         for split_name, split_data in datasets.items():
-            empathy_scores = []
-            for item in split_data:
-                if 'empathy_pairs' in item:
-                    for pair in item['empathy_pairs']:
-                        if 'empathy_score' in pair:
-                            empathy_scores.append(pair['empathy_score'])
+            scores = np.fromiter(
+                (pair['empathy_score'] for item in split_data
+                 for pair in item.get('empathy_pairs', ()) if 'empathy_score' in pair),
+                dtype=np.float64
+            )
             
+            # Cast NumPy scalars back to Python types so the report stays JSON serializable
             report["dataset_statistics"][split_name] = {
                 "total_examples": len(split_data),
-                "avg_empathy_score": np.mean(empathy_scores) if empathy_scores else 0,
-                "empathy_std": np.std(empathy_scores) if empathy_scores else 0,
-                "high_empathy_count": sum(1 for s in empathy_scores if s >= 0.8),
-                "medium_empathy_count": sum(1 for s in empathy_scores if 0.6 <= s < 0.8),
-                "low_empathy_count": sum(1 for s in empathy_scores if s < 0.6)
+                "avg_empathy_score": float(scores.mean()) if scores.size else 0,
+                "empathy_std": float(scores.std()) if scores.size else 0,
+                "high_empathy_count": int((scores >= 0.8).sum()),
+                "medium_empathy_count": int(((scores >= 0.6) & (scores < 0.8)).sum()),
+                "low_empathy_count": int((scores < 0.6).sum())
             }
         
         # Save report
@@ -238,12 +502,13 @@ class DataProcessingPipeline:
         self.logger.info("🚀 Starting AuraChat Data Processing Pipeline")
         
         try:
-            # Stage 1: Load and clean raw data
-            raw_data = self.load_raw_data()
-            clean_data = self.run_stage1_cleaning(raw_data)
+            # Stage 1: Load and clean raw data, in a producer thread
+            raw_batches = self.load_raw_data()
+            cleaned = prefetch(self.iter_stage1_cleaning(raw_batches),
+                               max_prefetch=self.config["stage_queue_size"])
             
-            # Stage 2: Empathy scoring
-            empathy_data = self.run_stage2_empathy(clean_data)
+            # Stage 2: Empathy scoring, consuming stage 1 output as it is produced
+            empathy_data = self.run_stage2_empathy(cleaned)
             
             # Stage 3: Dataset generation
             datasets = self.run_stage3_datasets(empathy_data)
@@ -265,6 +530,8 @@ class DataProcessingPipeline:
         except Exception as e:
             self.logger.error(f"❌ Pipeline failed: {e}")
             raise
+        finally:
+            self.shutdown_pool()
 
 def main():
     parser = argparse.ArgumentParser(description="AuraChat Data Processing Pipeline")
@@ -3,17 +3,95 @@ Stage 1: Data Validation and Cleaning
 Processes raw Reddit extraction data and prepares it for empathy scoring
 """
 
-import json
 import re
+import string
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Iterator
 from datetime import datetime
 import hashlib
+from functools import lru_cache
 
+import orjson
 import spacy
 from langdetect import detect
 import pandas as pd
 
+try:
+    import re2  # google-re2: linear-time DFA matching, same API as re
+except ImportError:
+    re2 = None
+
+def _compile_ascii(pattern: str):
+    r"""Compile `pattern` for ASCII-only text: with RE2 when installed and supported, else with re
+    
+    RE2's \w, \d and \b are ASCII-only while re's are Unicode-aware, so the two engines
+    only give identical matches on ASCII input.
+    """
+    if re2 is not None:
+        try:
+            return re2.compile(pattern)
+        except re2.error:
+            pass
+    return re.compile(pattern)
+
+@lru_cache(maxsize=None)
+def load_nlp(model_name: str):
+    """Load a spaCy model once per process and share it between cleaners"""
+    # Only NER is used (for PERSON masking)
+    return spacy.load(model_name, disable=["tagger", "parser", "attribute_ruler", "lemmatizer"])
+
+# Shared default for missing metadata; never mutated
+_EMPTY: Dict[str, Any] = {}
+
+# Distinct texts remembered per cleaner; bot replies and canned responses repeat a lot
+CLEAN_TEXT_CACHE_SIZE = 65536
+
+_ASCII_LETTERS = string.ascii_letters.encode()
+_WHITESPACE = string.whitespace.encode()
+
+def looks_english(text: str) -> bool:
+    """Cheap pre-check: pure ASCII text made almost entirely of letters
+    
+    Most English Reddit text passes this; anything else is left to langdetect.
+    """
+    if not text.isascii():
+        return False
+    visible = text.encode("ascii").translate(None, _WHITESPACE)
+    if not visible:
+        return False
+    letters = len(visible) - len(visible.translate(None, _ASCII_LETTERS))
+    return letters / len(visible) > 0.9
+
+# Capitalized words that routinely open Reddit sentences but never name a person
+_SENTENCE_STARTERS = frozenset({
+    "i", "i'm", "i've", "i'll", "i'd", "im", "you", "you're", "you've", "your",
+    "we", "he", "she", "they", "it", "it's", "its", "my", "our", "the", "this",
+    "that", "there", "a", "an", "and", "but", "so", "if", "when", "what", "how",
+    "why", "yes", "no", "thank", "thanks", "hi", "hey", "sorry", "please", "just",
+    "don't", "do", "is", "are", "not", "maybe", "also", "honestly", "edit", "update",
+})
+
+def may_contain_names(text: str) -> bool:
+    """False when no word could start a PERSON entity, so NER can be skipped"""
+    for word in text.split():
+        # Strip first so names wrapped in punctuation, like "(Mike)" or "*John*", still count
+        word = word.strip(string.punctuation)
+        if word[:1].isupper() and word.lower() not in _SENTENCE_STARTERS:
+            return True
+    return False
+
+def _list_pair(pair: list) -> Optional[Tuple[Any, Any]]:
+    """[input, response, ...] as written by the extractor"""
+    return (pair[0], pair[1]) if len(pair) >= 2 else None
+
+def _dict_pair(pair: dict) -> Tuple[Any, Any]:
+    """Dict pairs, accepting the common chat-format key names"""
+    return (pair.get("input") or pair.get("user_message") or pair.get("question"),
+            pair.get("response") or pair.get("assistant_message") or pair.get("answer"))
+
+# Empathy pair formats, looked up by exact type
+_PAIR_EXTRACTORS = {list: _list_pair, dict: _dict_pair}
+
 class DataCleaner:
     """Handles data validation, cleaning, and normalization"""
     
@@ -23,7 +101,7 @@ class DataCleaner:
         
         # Initialize spaCy for text processing
         try:
-            self.nlp = spacy.load("en_core_web_sm")
+            self.nlp = load_nlp("en_core_web_sm")
         except OSError:
             self.logger.warning("spaCy English model not found. Install with: python -m spacy download en_core_web_sm")
             self.nlp = None
@@ -31,32 +109,84 @@ class DataCleaner:
         self.quality_thresholds = config.get("quality_thresholds", {})
         self.text_processing = config.get("text_processing", {})
         
+        # Quality thresholds, read once instead of on every conversation
+        self._min_pairs = self.quality_thresholds.get("min_empathy_pairs", 2)
+        self._min_score = self.quality_thresholds.get("min_post_score", 10)
+        self._max_length = self.quality_thresholds.get("max_post_length", 2000)
+        self._min_comment_length = self.quality_thresholds.get("min_comment_length", 20)
+        
+        # Text processing switches, read once instead of on every clean_text call
+        self._remove_markdown = self.text_processing.get("remove_markdown", True)
+        self._normalize_whitespace = self.text_processing.get("normalize_whitespace", True)
+        self._anonymize_names = bool(self.nlp) and self.text_processing.get("remove_pii", True) \
+            and self.text_processing.get("anonymize_names", True)
+        
         # Compile regex patterns for cleaning
         self.url_pattern = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
         self.username_pattern = re.compile(r'/u/\w+|u/\w+|@\w+')
         self.subreddit_pattern = re.compile(r'/r/\w+|r/\w+')
+        # Markdown substitutes backreferences, which stay on re
         self.markdown_pattern = re.compile(r'\*{1,2}([^*]+)\*{1,2}|_{1,2}([^_]+)_{1,2}|\[([^\]]+)\]\([^)]+\)')
         
         # PII patterns (basic implementation)
         self.phone_pattern = re.compile(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b')
         self.email_pattern = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
         
+        # Enabled substitutions fused into one alternation, so clean_text scans each text once
+        fused_steps = [
+            ("url", self.url_pattern, "", "remove_urls"),
+            ("user", self.username_pattern, "", "remove_usernames"),
+            ("sub", self.subreddit_pattern, "", "remove_subreddit_mentions"),
+            ("phone", self.phone_pattern, "[PHONE]", "remove_pii"),
+            ("email", self.email_pattern, "[EMAIL]", "remove_pii"),
+        ]
+        fused_steps = [step for step in fused_steps if self.text_processing.get(step[3], True)]
+        self._replacements = {name: repl for name, _, repl, _ in fused_steps}
+        fused = "|".join(f"(?P<{name}>{pattern.pattern})" for name, pattern, _, _ in fused_steps)
+        self._fused = re.compile(fused) if fused_steps else None
+        # RE2 takes the ASCII texts, which is most of them; anything else stays on re
+        self._fused_ascii = _compile_ascii(fused) if fused_steps else None
+        
+        # Substitutions clean_text applies, in order, as (pattern for ASCII text, pattern, repl).
+        # The fused pass goes first; markdown is kept apart because it substitutes backreferences
+        self._ops = []
+        if self._fused:
+            self._ops.append((self._fused_ascii, self._fused, self._dispatch))
+        if self._remove_markdown:
+            self._ops.append((self.markdown_pattern, self.markdown_pattern, r'\1\2\3'))
+        self._noop = not self._ops and not self._normalize_whitespace
+        
+        # Cleaning is a pure function of the text once the config is fixed
+        self._clean_text_cached = lru_cache(maxsize=CLEAN_TEXT_CACHE_SIZE)(self._clean_text)
+        
     def clean_batch(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Clean a batch of conversations"""
         cleaned_batch = []
+        # One processing timestamp covers the whole batch
+        batch_ts = datetime.now().isoformat()
         
         for conversation in batch:
             try:
-                cleaned_conv = self.clean_conversation(conversation)
+                cleaned_conv = self._clean_conversation(conversation, batch_ts)
                 if cleaned_conv:
                     cleaned_batch.append(cleaned_conv)
             except Exception as e:
                 self.logger.error(f"Error cleaning conversation {conversation.get('conversation_id', 'unknown')}: {e}")
-                
-        return cleaned_batch
+        
+        # Names are masked for the whole batch in one spaCy pass
+        return self.anonymize_names(cleaned_batch)
     
     def clean_conversation(self, conversation: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Clean and validate a single conversation"""
+        cleaned_conv = self._clean_conversation(conversation, datetime.now().isoformat())
+        if not cleaned_conv:
+            return None
+        
+        result = self.anonymize_names([cleaned_conv])
+        return result[0] if result else None
+    
+    def _clean_conversation(self, conversation: Dict[str, Any], processing_timestamp: str) -> Optional[Dict[str, Any]]:
+        """Validate and regex-clean a conversation; names are masked separately"""
         
         # Basic validation
         if not self.validate_basic_structure(conversation):
@@ -79,6 +209,7 @@ class DataCleaner:
             return None
             
         # Create cleaned conversation object
+        metadata = conversation.get("metadata", _EMPTY)
         result = {
             "conversation_id": self.generate_clean_id(conversation),
             "subreddit": cleaned_conversation.get("subreddit", "").lower(),
@@ -87,10 +218,10 @@ class DataCleaner:
             "empathy_pairs": cleaned_pairs,
             "metadata": {
                 "source_subreddit": conversation.get("subreddit"),
-                "original_score": conversation.get("metadata", {}).get("post_score", 0),
-                "original_comment_count": conversation.get("metadata", {}).get("num_comments", 0),
-                "extraction_timestamp": conversation.get("metadata", {}).get("extraction_timestamp"),
-                "processing_timestamp": datetime.now().isoformat(),
+                "original_score": metadata.get("post_score", 0),
+                "original_comment_count": metadata.get("num_comments", 0),
+                "extraction_timestamp": metadata.get("extraction_timestamp"),
+                "processing_timestamp": processing_timestamp,
                 "quality_flags": []
             }
         }
@@ -118,26 +249,10 @@ class DataCleaner:
     
     def meets_quality_thresholds(self, conversation: Dict[str, Any]) -> bool:
         """Check if conversation meets quality thresholds"""
-        thresholds = self.quality_thresholds
-        
-        # Check minimum empathy pairs
-        min_pairs = thresholds.get("min_empathy_pairs", 2)
-        if len(conversation.get("empathy_pairs", [])) < min_pairs:
-            return False
-            
-        # Check post score
-        min_score = thresholds.get("min_post_score", 10)
-        post_score = conversation.get("metadata", {}).get("post_score", 0)
-        if post_score < min_score:
-            return False
-            
-        # Check post length
-        max_length = thresholds.get("max_post_length", 2000)
-        post_content = conversation.get("post_content", "")
-        if len(post_content) > max_length:
-            return False
-            
-        return True
+        # Minimum empathy pairs, minimum post score, maximum post length
+        return (len(conversation.get("empathy_pairs", ())) >= self._min_pairs
+                and conversation.get("metadata", _EMPTY).get("post_score", 0) >= self._min_score
+                and len(conversation.get("post_content", "")) <= self._max_length)
     
     def clean_text_content(self, conversation: Dict[str, Any]) -> Dict[str, Any]:
         """Clean all text content in the conversation"""
@@ -155,51 +270,82 @@ class DataCleaner:
         """Comprehensive text cleaning"""
         if not text or not isinstance(text, str):
             return ""
-            
-        # Remove URLs
-        if self.text_processing.get("remove_urls", True):
-            text = self.url_pattern.sub("", text)
-            
-        # Remove usernames
-        if self.text_processing.get("remove_usernames", True):
-            text = self.username_pattern.sub("", text)
-            
-        # Remove subreddit mentions
-        if self.text_processing.get("remove_subreddit_mentions", True):
-            text = self.subreddit_pattern.sub("", text)
-            
-        # Remove markdown formatting
-        if self.text_processing.get("remove_markdown", True):
-            text = self.markdown_pattern.sub(r'\1\2\3', text)
-            
-        # Remove PII
-        if self.text_processing.get("remove_pii", True):
-            text = self.remove_pii(text)
+        if self._noop:
+            return text
+        return self._clean_text_cached(text)
+    
+    def _clean_text(self, text: str) -> str:
+        """Uncached body of clean_text"""
+        is_ascii = text.isascii()
+        for ascii_pattern, pattern, repl in self._ops:
+            text = (ascii_pattern if is_ascii else pattern).sub(repl, text)
             
         # Normalize whitespace
-        if self.text_processing.get("normalize_whitespace", True):
-            text = re.sub(r'\s+', ' ', text).strip()
+        if self._normalize_whitespace:
+            text = ' '.join(text.split())
             
         return text
     
-    def remove_pii(self, text: str) -> str:
-        """Remove personally identifiable information"""
-        # Remove phone numbers
-        text = self.phone_pattern.sub("[PHONE]", text)
+    def _dispatch(self, match) -> str:
+        """Replacement for whichever fused pattern matched"""
+        return self._replacements[match.lastgroup]
+    
+    def anonymize_names(self, conversations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Mask PERSON entities in cleaned conversations with one batched spaCy pass
         
-        # Remove email addresses
-        text = self.email_pattern.sub("[EMAIL]", text)
+        Pairs that fall under the minimum length once masked are dropped, as are
+        conversations left without pairs.
+        """
+        if not self._anonymize_names:
+            return conversations
         
-        # Basic name anonymization (simple implementation)
-        if self.text_processing.get("anonymize_names", True):
-            # This is a basic implementation - could be enhanced with NER
-            if self.nlp:
-                doc = self.nlp(text)
-                for ent in doc.ents:
-                    if ent.label_ == "PERSON":
-                        text = text.replace(ent.text, "[NAME]")
-                        
-        return text
+        # Each text travels through spaCy with a back-pointer to the field it came from
+        fields = ((container[key], (container, key))
+                  for container, key in self._text_fields(conversations)
+                  if may_contain_names(container[key]))
+        for doc, (container, key) in self.nlp.pipe(fields, batch_size=128, as_tuples=True):
+            container[key] = self.mask_names(doc)
+        
+        min_length = self._min_comment_length
+        kept = []
+        for conversation in conversations:
+            pairs = []
+            for pair in conversation["empathy_pairs"]:
+                if len(pair["input"]) < min_length or len(pair["response"]) < min_length:
+                    continue
+                pair["pair_metadata"]["cleaned_input_length"] = len(pair["input"])
+                pair["pair_metadata"]["cleaned_response_length"] = len(pair["response"])
+                pairs.append(pair)
+            
+            if pairs:
+                conversation["empathy_pairs"] = pairs
+                kept.append(conversation)
+                
+        return kept
+    
+    def _text_fields(self, conversations: List[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], str]]:
+        """Yield (container, key) for every text field of cleaned conversations"""
+        for conversation in conversations:
+            yield conversation, "context"
+            yield conversation, "post_title"
+            for pair in conversation["empathy_pairs"]:
+                yield pair, "input"
+                yield pair, "response"
+    
+    def mask_names(self, doc) -> str:
+        """Rebuild the text of `doc` with each PERSON span replaced by [NAME]"""
+        parts = []
+        last = 0
+        for ent in doc.ents:
+            if ent.label_ == "PERSON":
+                parts.append(doc.text[last:ent.start_char])
+                parts.append("[NAME]")
+                last = ent.end_char
+                
+        if not parts:
+            return doc.text
+        parts.append(doc.text[last:])
+        return "".join(parts)
     
     def is_english_content(self, conversation: Dict[str, Any]) -> bool:
         """Detect if conversation content is in English"""
@@ -217,6 +363,10 @@ class DataCleaner:
                 
         if not text_to_check.strip():
             return False
+        
+        # Skip the n-gram classifier for the common ASCII-only case
+        if looks_english(text_to_check):
+            return True
             
         try:
             detected_lang = detect(text_to_check)
@@ -239,24 +389,33 @@ class DataCleaner:
     def clean_empathy_pair(self, pair: Any) -> Optional[Dict[str, Any]]:
         """Clean a single empathy pair"""
         # Handle different input formats
-        if isinstance(pair, list) and len(pair) >= 2:
-            input_text = pair[0]
-            response_text = pair[1]
-        elif isinstance(pair, dict):
-            input_text = pair.get("input") or pair.get("user_message") or pair.get("question")
-            response_text = pair.get("response") or pair.get("assistant_message") or pair.get("answer")
-        else:
+        extractor = _PAIR_EXTRACTORS.get(type(pair))
+        if extractor is None:
             return None
+        texts = extractor(pair)
+        if texts is None:
+            return None
+        input_text, response_text = texts
             
         if not input_text or not response_text:
             return None
+        if not isinstance(input_text, str):
+            input_text = str(input_text)
+        if not isinstance(response_text, str):
+            response_text = str(response_text)
+        input_length = len(input_text)
+        response_length = len(response_text)
+        
+        # Cleaning only shortens text, so reject short pairs before doing any regex work
+        min_length = self._min_comment_length
+        if input_length < min_length or response_length < min_length:
+            return None
             
         # Clean both texts
-        cleaned_input = self.clean_text(str(input_text))
-        cleaned_response = self.clean_text(str(response_text))
+        cleaned_input = self.clean_text(input_text)
+        cleaned_response = self.clean_text(response_text)
         
         # Check minimum length
-        min_length = self.quality_thresholds.get("min_comment_length", 20)
         if len(cleaned_input) < min_length or len(cleaned_response) < min_length:
             return None
             
@@ -267,8 +426,8 @@ class DataCleaner:
             "empathy_score": 0.0,  # Will be filled in Stage 2
             "quality_score": 0.0,  # Will be filled in Stage 2
             "pair_metadata": {
-                "original_input_length": len(str(input_text)),
-                "original_response_length": len(str(response_text)),
+                "original_input_length": input_length,
+                "original_response_length": response_length,
                 "cleaned_input_length": len(cleaned_input),
                 "cleaned_response_length": len(cleaned_response)
             }
@@ -281,9 +440,9 @@ class DataCleaner:
         
         # Create a hash-based ID if original is not suitable
         if not original_id or len(original_id) < 5:
-            content_hash = hashlib.md5(
-                (subreddit + str(conversation.get("post_content", "")[:100])).encode()
-            ).hexdigest()[:12]
+            digest = hashlib.blake2b(subreddit.encode(), digest_size=6)
+            digest.update(str(conversation.get("post_content", ""))[:100].encode())
+            content_hash = digest.hexdigest()
             return f"clean_{subreddit}_{content_hash}"
         else:
             # Clean the original ID
@@ -323,7 +482,7 @@ def main():
     
     if result:
         print("✅ Cleaning successful!")
-        print(json.dumps(result, indent=2))
+        print(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode())
     else:
         print("❌ Cleaning failed")
 
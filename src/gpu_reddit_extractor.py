@@ -3,31 +3,48 @@ GPU-Accelerated Reddit Data Extractor
 High-performance batch processing for large-scale empathy data collection
 """
 
-import praw
 import asyncio
 import aiohttp
-import json
+import msgspec
+import re
 import time
 import torch
 import numpy as np
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple, Iterator, AsyncIterator, Sequence, Container
 import logging
 from pathlib import Path
 import gc
+import threading
+from collections import deque
 import psutil
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm.asyncio import tqdm as atqdm
-from tqdm import tqdm
 import pandas as pd
-import pickle
-import gzip
 import hashlib
+from email.utils import parsedate_to_datetime
+import zlib
+import zstandard
+import diskcache
+
+try:
+    import uvloop  # libuv-based event loop; not available on Windows
+except ImportError:
+    uvloop = None
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+try:
+    import faiss  # Approximate nearest-neighbour index for near-duplicate responses
+except ImportError:
+    faiss = None
 
 from config.settings import (
     REDDIT_CONFIG, EMPATHETIC_SUBREDDITS, DATA_CONFIG, 
-    GPU_CONFIG, PATHS, LOGGING_CONFIG, QUALITY_THRESHOLDS
+    GPU_CONFIG, PATHS, LOGGING_CONFIG, QUALITY_THRESHOLDS,
+    PUSHSHIFT_CONFIG
 )
 
 # Setup logging
@@ -41,33 +58,220 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@dataclass
-class ConversationData:
+# Both markers are 9 characters, so a comment prefix is checked with one set lookup
+_DELETED_MARKERS = frozenset(('[deleted]', '[removed]'))
+
+class Comment(msgspec.Struct):
+    """A filtered comment, stored in fixed slots rather than a per-comment dict"""
+    comment_id: str
+    body: str
+    score: int
+    created_utc: Optional[float]
+    is_root: bool
+    parent_id: Optional[str]  # Bare id of the parent comment, None for top-level comments
+    depth: int
+    author: str
+
+class CachedComments(msgspec.Struct):
+    """A post's filtered comments as stored in the fetch cache"""
+    num_comments: int
+    comments: List[Comment]
+
+class ConversationData(msgspec.Struct):
     """Structured conversation data for GPU processing"""
     subreddit: str
     post_id: str
     post_title: str
     post_content: str
     post_score: int
-    comments: List[Dict[str, Any]]
+    comments: List[Comment]
     extracted_at: str
     conversation_id: str
     empathy_pairs: List[Tuple[str, str]]
     metadata: Dict[str, Any]
 
+class RateLimiter:
+    """Sliding-window rate limiter driven by Reddit's X-Ratelimit-* headers"""
+    
+    def __init__(self, max_requests: int, window_seconds: float, reserve: int):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.reserve = reserve
+        self.request_times = deque()
+        self.remaining = None
+        self.reset_timestamp = None
+        self._lock = asyncio.Lock()
+    
+    def update(self, headers):
+        """Record the X-Ratelimit-Remaining / Reset values of a Reddit response"""
+        remaining = headers.get('x-ratelimit-remaining')
+        reset = headers.get('x-ratelimit-reset')
+        if remaining is not None and reset is not None:
+            self.remaining = float(remaining)
+            self.reset_timestamp = time.time() + float(reset)
+    
+    def record_request(self):
+        """Record an issued request in the sliding window"""
+        self.request_times.append(time.monotonic())
+    
+    def time_until_next_request(self) -> float:
+        """Seconds to wait before the next request stays within quota"""
+        now = time.monotonic()
+        while self.request_times and now - self.request_times[0] >= self.window_seconds:
+            self.request_times.popleft()
+        
+        # Local window is full: wait for the oldest request to age out
+        if len(self.request_times) >= self.max_requests:
+            return max(0.0, self.window_seconds - (now - self.request_times[0]))
+        
+        # Reddit reports the quota is nearly spent: spread what is left until reset
+        if self.remaining is not None and self.remaining <= self.reserve:
+            reset_seconds = self.reset_timestamp - time.time()
+            return max(0.0, reset_seconds / max(self.remaining, 1))
+        
+        return 0.0
+    
+    async def wait(self):
+        """Wait until the quota allows another request, then record it"""
+        # Serialize concurrent tasks through the gate so they cannot all see spare quota at once
+        async with self._lock:
+            delay = self.time_until_next_request()
+            if delay > 0:
+                logger.debug(f"⏳ Rate limit: sleeping {delay:.2f}s ({self.remaining} requests remaining)")
+                await asyncio.sleep(delay)
+            self.record_request()
+
+def retry_after_seconds(headers, default: float) -> float:
+    """Seconds requested by a Retry-After header (delay or HTTP date), else `default`"""
+    value = headers.get('Retry-After')
+    if value is None:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+class RedditClient:
+    """OAuth session for one Reddit app credential, with its own token and rate limit"""
+    
+    def __init__(self, client_id: str, client_secret: str, http: aiohttp.ClientSession):
+        self.auth = aiohttp.BasicAuth(client_id, client_secret)
+        self.http = http
+        self.session = aiohttp.ClientSession(
+            base_url=REDDIT_CONFIG['oauth_url'],
+            connector=aiohttp.TCPConnector(limit=64, limit_per_host=DATA_CONFIG['max_connections_per_host'],
+                                           keepalive_timeout=60, ttl_dns_cache=300),
+            headers={
+                'User-Agent': REDDIT_CONFIG['user_agent'],
+                'Accept-Encoding': 'gzip'
+            },
+            timeout=aiohttp.ClientTimeout(total=DATA_CONFIG['api_timeout'])
+        )
+        self.rate_limiter = RateLimiter(
+            max_requests=DATA_CONFIG['rate_limit_requests'],
+            window_seconds=DATA_CONFIG['rate_limit_window'],
+            reserve=DATA_CONFIG['rate_limit_reserve']
+        )
+        self.token = None
+        self.token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
+    
+    async def close(self):
+        """Close the OAuth session"""
+        await self.session.close()
+    
+    async def refresh_token(self):
+        """Fetch an application-only (read-only) OAuth token once the current one expires"""
+        async with self._token_lock:
+            # Another task may have refreshed while this one waited
+            if time.monotonic() < self.token_expires_at:
+                return
+            
+            async with self.http.post(REDDIT_CONFIG['token_url'], auth=self.auth,
+                                      data={'grant_type': 'client_credentials'}) as response:
+                response.raise_for_status()
+                token = await response.json(content_type=None)
+            
+            self.token = token['access_token']
+            # Renew a minute early so requests in flight never carry an expired token
+            self.token_expires_at = time.monotonic() + token['expires_in'] - 60
+    
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """GET a Reddit OAuth endpoint as JSON within the rate limit, retrying transient failures"""
+        params = {'raw_json': 1, **(params or {})}
+        
+        for attempt in range(DATA_CONFIG['retry_attempts'] + 1):
+            await self.rate_limiter.wait()
+            if time.monotonic() >= self.token_expires_at:
+                await self.refresh_token()
+            
+            try:
+                async with self.session.get(path, params=params,
+                                            headers={'Authorization': f"bearer {self.token}"}) as response:
+                    self.rate_limiter.update(response.headers)
+                    if response.status == 401:
+                        self.token_expires_at = 0.0  # Token revoked early; fetch a new one on retry
+                    response.raise_for_status()
+                    return await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # Private, banned or missing subreddits will not recover on retry
+                retryable = not isinstance(e, aiohttp.ClientResponseError) or e.status in (401, 429) or e.status >= 500
+                if not retryable or attempt == DATA_CONFIG['retry_attempts']:
+                    raise
+                await asyncio.sleep(DATA_CONFIG['backoff_factor'] ** attempt)
+    
+    async def listing(self, path: str, limit: int) -> AsyncIterator[Dict[str, Any]]:
+        """Page through a Reddit listing, yielding each child's data"""
+        after = None
+        fetched = 0
+        
+        while fetched < limit:
+            params = {'limit': min(100, limit - fetched)}
+            if after:
+                params['after'] = after
+            
+            listing = (await self.get(path, params))['data']
+            for child in listing['children']:
+                yield child['data']
+                fetched += 1
+            
+            after = listing.get('after')
+            if not after or not listing['children']:
+                break
+
 class GPURedditExtractor:
-    """High-performance Reddit data extractor with GPU acceleration"""
+    """High-performance Reddit data extractor with GPU acceleration
+    
+    API clients need a running event loop, so use as ``async with GPURedditExtractor() as extractor``.
+    """
     
     def __init__(self):
         self.device = torch.device(GPU_CONFIG['device'] if torch.cuda.is_available() else 'cpu')
-        self.setup_reddit_api()
         self.setup_directories()
+        self.cache = diskcache.Cache(PATHS['cache'], size_limit=DATA_CONFIG['cache_size_limit'])
+        self.cache_decoder = msgspec.msgpack.Decoder(CachedComments)
+        # Posts already written to a batch file survive restarts, unlike the evicting cache
+        self.seen_posts = diskcache.Index(str(Path(PATHS['checkpoints']) / 'seen_posts'))
+        self.encoder = msgspec.json.Encoder()
+        # All empathy keywords in one alternation, longest first, scanned once per comment
+        keywords = sorted({keyword.lower() for keyword in DATA_CONFIG['empathy_keywords']}, key=len, reverse=True)
+        self.empathy_pattern = re.compile('|'.join(map(re.escape, keywords)))
+        self.setup_empathy_model()
         self.checkpoint_data = {}
+        self._now_second = None
+        self._now_iso = None
         self.extraction_stats = {
             'total_posts_processed': 0,
             'total_comments_extracted': 0,
             'empathy_pairs_found': 0,
             'subreddits_completed': 0,
+            'cache_hits': 0,
+            'seen_posts_skipped': 0,
+            'near_duplicates_skipped': 0,
             'start_time': None,
             'last_checkpoint': None
         }
@@ -75,225 +279,636 @@ class GPURedditExtractor:
         logger.info(f"🚀 GPU Reddit Extractor initialized")
         logger.info(f"💻 Device: {self.device}")
         logger.info(f"🔥 GPU Memory: {torch.cuda.get_device_properties(0).total_memory / 1e9:.1f}GB" if torch.cuda.is_available() else "CPU Mode")
+    
+    async def __aenter__(self):
+        self.setup_pushshift_session()
+        try:
+            await self.setup_reddit_api()
+        except Exception:
+            await self.http.close()
+            raise
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        for client in self.reddit_clients:
+            await client.close()
+        await self.http.close()
+        self.cache.close()
+        self.seen_posts.cache.close()
+        
+    async def setup_reddit_api(self):
+        """Open one OAuth client per configured Reddit app credential with error handling"""
+        credentials = REDDIT_CONFIG['credentials'] or [
+            {'client_id': REDDIT_CONFIG['client_id'], 'client_secret': REDDIT_CONFIG['client_secret']}
+        ]
+        self.reddit_clients = [
+            RedditClient(credential['client_id'], credential['client_secret'], self.http)
+            for credential in credentials
+        ]
         
-    def setup_reddit_api(self):
-        """Initialize Reddit API with error handling"""
         try:
-            # Use read-only authentication (no username/password needed)
-            self.reddit = praw.Reddit(
-                client_id=REDDIT_CONFIG['client_id'],
-                client_secret=REDDIT_CONFIG['client_secret'],
-                user_agent=REDDIT_CONFIG['user_agent']
-            )
-            
-            # Test API connection with a simple read-only request
-            test_subreddit = self.reddit.subreddit('test')
-            list(test_subreddit.hot(limit=1))  # Simple test
-            logger.info("✅ Reddit API authenticated successfully")
+            # Test every credential with a simple read-only request
+            await asyncio.gather(*(client.get('/r/test/hot', {'limit': 1}) for client in self.reddit_clients))
+            logger.info(f"✅ Reddit API authenticated successfully ({len(self.reddit_clients)} credentials)")
             
         except Exception as e:
             logger.error(f"❌ Reddit API authentication failed: {e}")
+            for client in self.reddit_clients:
+                await client.close()
             raise
     
+    def reddit_client(self, subreddit_name: str) -> 'RedditClient':
+        """Pick the credential that serves a subreddit, stable across runs"""
+        return self.reddit_clients[zlib.crc32(subreddit_name.encode()) % len(self.reddit_clients)]
+    
+    def setup_pushshift_session(self):
+        """Create a pooled keep-alive HTTP session for bulk Pushshift and OAuth token requests"""
+        self.http = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300),
+            headers={
+                'User-Agent': REDDIT_CONFIG['user_agent'],
+                'Accept-Encoding': 'gzip'
+            },
+            timeout=aiohttp.ClientTimeout(total=DATA_CONFIG['api_timeout'])
+        )
+        # The archive sends no quota headers, so its limiter only paces by the local window
+        self.pushshift_limiter = RateLimiter(
+            max_requests=PUSHSHIFT_CONFIG['rate_limit_requests'],
+            window_seconds=PUSHSHIFT_CONFIG['rate_limit_window'],
+            reserve=0
+        )
+    
+    def setup_empathy_model(self):
+        """Load the sentence-embedding model that scores empathy on the GPU, if configured"""
+        self.empathy_model = None
+        self.dedup_index = None
+        self._encode_lock = threading.Lock()
+        self._dedup_lock = threading.Lock()
+        model_name = GPU_CONFIG.get('empathy_model')
+        if not model_name:
+            return
+        if SentenceTransformer is None:
+            logger.warning("⚠️ sentence-transformers not installed, using keyword empathy matching")
+            return
+        
+        self.empathy_model = SentenceTransformer(model_name, device=str(self.device))
+        if GPU_CONFIG['mixed_precision'] and self.device.type == 'cuda':
+            self.empathy_model.half()
+        
+        with torch.inference_mode():
+            references = self.empathy_model.encode(DATA_CONFIG['empathy_references'], convert_to_tensor=True,
+                                                   normalize_embeddings=True, show_progress_bar=False)
+            self.empathy_reference = torch.nn.functional.normalize(references.mean(dim=0), dim=0)
+        logger.info(f"💝 Empathy model loaded: {model_name}")
+        
+        # Embeddings are normalized, so inner product is cosine similarity
+        if faiss is not None:
+            dimension = self.empathy_model.get_sentence_embedding_dimension()
+            self.dedup_index = faiss.IndexHNSWFlat(dimension, 32, faiss.METRIC_INNER_PRODUCT)
+            self.dedup_index.hnsw.efSearch = 64
+    
     def setup_directories(self):
         """Create necessary directories"""
         for path in PATHS.values():
             Path(path).mkdir(parents=True, exist_ok=True)
         logger.info("📁 Directory structure created")
     
+    def utc_now_iso(self) -> str:
+        """Current UTC time as ISO 8601 at second resolution, formatted once per second"""
+        now = int(time.time())
+        if now != self._now_second:
+            self._now_second = now
+            self._now_iso = datetime.fromtimestamp(now, timezone.utc).isoformat()
+        return self._now_iso
+    
     def generate_conversation_id(self, subreddit: str, post_id: str) -> str:
-        """Generate unique conversation ID"""
-        timestamp = datetime.now().isoformat()
-        data = f"{subreddit}_{post_id}_{timestamp}"
-        return hashlib.md5(data.encode()).hexdigest()[:16]
+        """Generate a conversation ID that is stable across re-extractions"""
+        data = f"{subreddit}/{post_id}"
+        return hashlib.blake2b(data.encode(), digest_size=8).hexdigest()
     
-    def extract_empathy_pairs(self, post_content: str, comments: List[Dict]) -> List[Tuple[str, str]]:
-        """Extract potential empathy conversation pairs"""
+    def extract_empathy_pairs(self, post_content: str, comments: List[Comment],
+                              empathetic: Sequence[bool]) -> List[Tuple[str, str]]:
+        """Extract potential empathy conversation pairs
+        
+        `empathetic` flags each comment, in order, as returned by score_empathy. At most
+        ``max_pairs_per_post`` pairs are returned.
+        """
         pairs = []
+        max_pairs = DATA_CONFIG['max_pairs_per_post']
         
         # Post-to-comment pairs (user seeking help -> empathetic response)
-        for comment in comments[:5]:  # Top 5 comments
-            if (len(comment['body']) >= DATA_CONFIG['min_comment_length'] and
-                self.is_empathetic_response(comment['body'])):
-                pairs.append((post_content, comment['body']))
+        for comment, is_empathetic in zip(comments[:5], empathetic):  # Top 5 comments
+            if is_empathetic and len(comment.body) >= DATA_CONFIG['min_comment_length']:
+                pairs.append((post_content, comment.body))
+                if len(pairs) >= max_pairs:
+                    return pairs
         
         # Comment-to-reply pairs
-        comment_dict = {c['comment_id']: c for c in comments}
-        for comment in comments:
-            if comment.get('parent_id') and comment['parent_id'].startswith('t1_'):
-                parent_id = comment['parent_id'][3:]  # Remove 't1_' prefix
-                if parent_id in comment_dict:
-                    parent_comment = comment_dict[parent_id]
-                    if (self.is_empathetic_response(comment['body']) and
-                        len(parent_comment['body']) >= DATA_CONFIG['min_comment_length']):
-                        pairs.append((parent_comment['body'], comment['body']))
+        comment_dict = {c.comment_id: c for c in comments}
+        for comment, is_empathetic in zip(comments, empathetic):
+            if is_empathetic and comment.parent_id is not None:
+                parent_comment = comment_dict.get(comment.parent_id)
+                if parent_comment is not None and len(parent_comment.body) >= DATA_CONFIG['min_comment_length']:
+                    pairs.append((parent_comment.body, comment.body))
+                    if len(pairs) >= max_pairs:
+                        break
         
         return pairs
     
+    def score_empathy(self, texts: List[str]) -> Tuple[List[bool], Optional[torch.Tensor]]:
+        """Flag empathetic texts, encoding them all in one batched GPU pass
+        
+        Returns the flags and the normalized embeddings, which are None when no empathy
+        model is loaded and keyword matching is used instead.
+        """
+        if self.empathy_model is None:
+            return [self.is_empathetic_response(text) for text in texts], None
+        
+        # One model, one device: concurrent subreddit tasks take turns
+        with self._encode_lock, torch.inference_mode():
+            embeddings = self.empathy_model.encode(texts, batch_size=DATA_CONFIG['gpu_batch_size'],
+                                                   convert_to_tensor=True, normalize_embeddings=True,
+                                                   show_progress_bar=False)
+            flags = embeddings @ self.empathy_reference >= GPU_CONFIG['empathy_threshold']
+        return flags.tolist(), embeddings
+    
+    def drop_near_duplicates(self, pairs: List[Tuple[str, str]], comments: List[Comment],
+                             embeddings: torch.Tensor) -> List[Tuple[str, str]]:
+        """Drop pairs whose response nearly repeats one kept earlier during this run
+        
+        Reposts and copy-pasted replies would otherwise yield the same empathy pair
+        in many subreddits. `embeddings` are the score_empathy rows of `comments`.
+        Responses are searched and indexed one at a time, so near-identical replies
+        within the same post are caught too.
+        """
+        row = {comment.body: i for i, comment in enumerate(comments)}
+        responses = list(dict.fromkeys(response for _, response in pairs))
+        vectors = embeddings[[row[response] for response in responses]].float().cpu().numpy()
+        
+        duplicates = set()
+        with self._dedup_lock:
+            for response, vector in zip(responses, vectors):
+                vector = vector[np.newaxis]
+                if self.dedup_index.ntotal:
+                    similarity, _ = self.dedup_index.search(vector, 1)
+                    if similarity[0, 0] >= GPU_CONFIG['dedup_similarity']:
+                        duplicates.add(response)
+                        continue
+                self.dedup_index.add(vector)
+        
+        if not duplicates:
+            return pairs
+        self.extraction_stats['near_duplicates_skipped'] += len(duplicates)
+        return [pair for pair in pairs if pair[1] not in duplicates]
+    
     def is_empathetic_response(self, text: str) -> bool:
         """Check if text contains empathetic language"""
-        text_lower = text.lower()
-        empathy_count = sum(1 for keyword in DATA_CONFIG['empathy_keywords'] 
-                          if keyword in text_lower)
-        return empathy_count >= 2  # At least 2 empathy keywords
+        # At least 2 distinct empathy keywords; stop scanning as soon as the second one appears
+        found = set()
+        for match in self.empathy_pattern.finditer(text.lower()):
+            found.add(match.group())
+            if len(found) >= 2:
+                return True
+        return False
     
-    async def extract_subreddit_batch(self, subreddit_names: List[str]) -> List[ConversationData]:
-        """Extract data from a batch of subreddits asynchronously"""
-        conversations = []
+    async def queue_for_writer(self, writer_queue: asyncio.Queue, writer: asyncio.Task, item: Any):
+        """Put an item on the bounded writer queue, failing fast if the writer task has died
         
-        with ThreadPoolExecutor(max_workers=DATA_CONFIG['parallel_workers']) as executor:
-            # Submit extraction tasks
-            futures = {
-                executor.submit(self.extract_single_subreddit, name): name 
-                for name in subreddit_names
-            }
-            
-            # Collect results with progress tracking
-            for future in tqdm(as_completed(futures), 
-                             total=len(futures), 
-                             desc=f"Processing batch"):
-                subreddit_name = futures[future]
+        Nothing drains the queue once the writer is gone, so a plain ``put`` would block forever.
+        The writer's own exception is re-raised instead.
+        """
+        if not writer.done():
+            put = asyncio.ensure_future(writer_queue.put(item))
+            try:
+                await asyncio.wait((put, writer), return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                if not put.done():
+                    put.cancel()
+            if put.done():
+                return
+        
+        writer.result()
+        raise RuntimeError("Batch writer stopped before its queue was closed")
+    
+    async def extract_subreddit_batch(self, subreddit_names: List[str], writer_queue: asyncio.Queue,
+                                      writer: asyncio.Task) -> int:
+        """Extract data from a batch of subreddits asynchronously, streaming results to the writer"""
+        conversation_count = 0
+        # Requests are I/O bound against one rate-limited host, so workers beyond the
+        # connection pool would only wait on sockets
+        semaphore = asyncio.Semaphore(min(DATA_CONFIG['parallel_workers'], DATA_CONFIG['max_connections_per_host']))
+        
+        async def extract(name: str):
+            async with semaphore:
                 try:
-                    subreddit_conversations = future.result()
-                    conversations.extend(subreddit_conversations)
-                    self.extraction_stats['subreddits_completed'] += 1
-                    logger.info(f"✅ {subreddit_name}: {len(subreddit_conversations)} conversations")
+                    return name, await self.extract_single_subreddit(name)
                 except Exception as e:
-                    logger.error(f"❌ Failed to extract {subreddit_name}: {e}")
+                    logger.error(f"❌ Failed to extract {name}: {e}")
+                    return name, None
         
-        return conversations
+        # Collect results with progress tracking
+        tasks = [asyncio.create_task(extract(name)) for name in subreddit_names]
+        try:
+            for task in atqdm.as_completed(tasks, total=len(tasks), desc=f"Processing batch"):
+                subreddit_name, subreddit_conversations = await task
+                if subreddit_conversations is None:
+                    continue
+                await self.queue_for_writer(writer_queue, writer, subreddit_conversations)
+                conversation_count += len(subreddit_conversations)
+                self.extraction_stats['subreddits_completed'] += 1
+                logger.info(f"✅ {subreddit_name}: {len(subreddit_conversations)} conversations")
+        finally:
+            # If the writer died (or we were cancelled), stop the fetches nobody will collect
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        return conversation_count
     
-    def extract_single_subreddit(self, subreddit_name: str) -> List[ConversationData]:
+    async def extract_single_subreddit(self, subreddit_name: str) -> List[ConversationData]:
         """Extract conversations from a single subreddit"""
         conversations = []
         
         try:
-            subreddit = self.reddit.subreddit(subreddit_name)
-            post_count = 0
+            # Archived posts come from bulk Pushshift requests; the archive lags
+            # behind Reddit, so only fresh posts are fetched from the Reddit API
+            fresh_cutoff = int(time.time()) - PUSHSHIFT_CONFIG['fresh_content_hours'] * 3600
+            try:
+                async for conversation in self.extract_archived_posts(subreddit_name, before=fresh_cutoff):
+                    conversations.append(conversation)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # Conversations built before the failure are kept; the hot listing tops them up
+                logger.warning(f"⚠️ Pushshift unavailable for r/{subreddit_name} after {len(conversations)} "
+                               f"conversations, falling back to the Reddit API: {e}")
+                fresh_cutoff = None
             
-            # Extract from hot posts
-            for submission in subreddit.hot(limit=DATA_CONFIG['posts_per_subreddit']):
-                if (submission.num_comments < 2 or 
-                    submission.score < DATA_CONFIG['min_post_score']):
-                    continue
-                
-                # Extract post data
-                post_content = f"{submission.title}\n\n{submission.selftext}".strip()
-                if len(post_content) < DATA_CONFIG['min_comment_length']:
-                    continue
-                
-                # Extract comments
-                comments_data = self.extract_comments(submission)
-                if len(comments_data) < 2:  # Need at least 2 comments for conversation
-                    continue
-                
-                # Extract empathy pairs
-                empathy_pairs = self.extract_empathy_pairs(post_content, comments_data)
-                if not empathy_pairs:  # Skip if no empathy detected
-                    continue
-                
-                # Create conversation object
-                conversation = ConversationData(
-                    subreddit=subreddit_name,
-                    post_id=submission.id,
-                    post_title=submission.title,
-                    post_content=post_content,
-                    post_score=submission.score,
-                    comments=comments_data,
-                    extracted_at=datetime.now(timezone.utc).isoformat(),
-                    conversation_id=self.generate_conversation_id(subreddit_name, submission.id),
-                    empathy_pairs=empathy_pairs,
-                    metadata={
-                        'num_comments': len(comments_data),
-                        'empathy_pairs_count': len(empathy_pairs),
-                        'post_created_utc': submission.created_utc,
-                        'post_url': submission.url,
-                        'submission_type': 'self' if submission.is_self else 'link'
-                    }
-                )
-                
-                conversations.append(conversation)
-                post_count += 1
-                self.extraction_stats['total_posts_processed'] += 1
-                self.extraction_stats['empathy_pairs_found'] += len(empathy_pairs)
-                
-                # Rate limiting
-                time.sleep(DATA_CONFIG['rate_limit_delay'])
-                
-                # Progress update
-                if post_count % 50 == 0:
-                    logger.info(f"🔄 {subreddit_name}: {post_count} posts processed")
+            archived_ids = {conversation.post_id for conversation in conversations}
+            conversations.extend(await self.extract_live_posts(subreddit_name, since=fresh_cutoff,
+                                                               skip_ids=archived_ids))
         
         except Exception as e:
             logger.error(f"❌ Error extracting from r/{subreddit_name}: {e}")
         
         return conversations
     
-    def extract_comments(self, submission) -> List[Dict[str, Any]]:
-        """Extract and filter comments from a submission"""
-        comments_data = []
+    async def extract_archived_posts(self, subreddit_name: str, before: int) -> AsyncIterator[ConversationData]:
+        """Yield conversations from archived posts using bulk Pushshift requests
         
-        try:
-            submission.comments.replace_more(limit=0)
+        Conversations are yielded as they are built, so a caller keeps them if a later
+        archive request fails.
+        """
+        candidates = [
+            post async for post in self.pushshift_fetch(subreddit_name,
+                                                        size=PUSHSHIFT_CONFIG['page_size'],
+                                                        before=before,
+                                                        limit=DATA_CONFIG['posts_per_subreddit'])
+            if self.is_candidate_post(post)
+        ]
+        
+        # Fetch comment trees for many posts per request instead of one call per post
+        batch_size = PUSHSHIFT_CONFIG['comment_batch_size']
+        for i in range(0, len(candidates), batch_size):
+            posts = candidates[i:i + batch_size]
+            
+            # Only posts missing from the cache (or with new comments) need fetching
+            comments_by_post = {post['id']: self.cached_comments(post) for post in posts}
+            misses = [post_id for post_id, comments in comments_by_post.items() if comments is None]
+            if misses:
+                fetched = await self.pushshift_fetch_comments(misses)
+                for post in posts:
+                    if post['id'] in fetched:
+                        comments_data = fetched[post['id']]
+                        self.extraction_stats['total_comments_extracted'] += len(comments_data)
+                        self.cache_comments(post, comments_data)
+                        comments_by_post[post['id']] = comments_data
+            
+            for post in posts:
+                comments_data = comments_by_post[post['id']]
+                conversation = await self.build_conversation(subreddit_name, post, comments_data)
+                if conversation:
+                    yield conversation
+            
+            logger.info(f"🔄 {subreddit_name}: {min(i + batch_size, len(candidates))}/{len(candidates)} archived posts processed")
+    
+    async def extract_live_posts(self, subreddit_name: str, since: Optional[int] = None,
+                                 skip_ids: Container[str] = ()) -> List[ConversationData]:
+        """Extract conversations from the Reddit API, limited to posts newer than `since` when given
+        
+        Posts in `skip_ids` already have a conversation from the archive and are passed over.
+        """
+        conversations = []
+        post_count = 0
+        
+        # Without an archive cutoff, fall back to the hot listing
+        sort = 'hot' if since is None else 'new'
+        client = self.reddit_client(subreddit_name)
+        listing = client.listing(f"/r/{subreddit_name}/{sort}", DATA_CONFIG['posts_per_subreddit'])
+        
+        async for post in listing:
+            if since is not None and post['created_utc'] < since:
+                break
+            
+            if post['id'] in skip_ids or not self.is_candidate_post(post):
+                continue
+            
+            # Extract comments, reusing the cached tree if the comment count is unchanged
+            comments_data = self.cached_comments(post)
+            if comments_data is None:
+                comments_data = await self.fetch_comments(subreddit_name, post['id'])
+                self.cache_comments(post, comments_data)
             
-            for comment in submission.comments.list()[:DATA_CONFIG['max_comments_per_post']]:
-                if (hasattr(comment, 'body') and 
-                    not comment.body.startswith(('[deleted]', '[removed]')) and
-                    len(comment.body) >= DATA_CONFIG['min_comment_length'] and
-                    len(comment.body) <= DATA_CONFIG['max_comment_length'] and
-                    comment.score >= DATA_CONFIG['min_comment_score']):
-                    
-                    comments_data.append({
-                        'comment_id': comment.id,
-                        'body': comment.body,
-                        'score': comment.score,
-                        'created_utc': comment.created_utc,
-                        'is_root': comment.is_root,
-                        'parent_id': str(comment.parent_id) if hasattr(comment, 'parent_id') else None,
-                        'depth': getattr(comment, 'depth', 0),
-                        'author': str(comment.author) if comment.author else '[deleted]'
-                    })
+            conversation = await self.build_conversation(subreddit_name, post, comments_data)
+            if not conversation:
+                continue
             
-            self.extraction_stats['total_comments_extracted'] += len(comments_data)
+            conversations.append(conversation)
+            post_count += 1
             
+            # Progress update
+            if post_count % 50 == 0:
+                logger.info(f"🔄 {subreddit_name}: {post_count} posts processed")
+        
+        return conversations
+    
+    async def pushshift_fetch(self, subreddit: str, size: int = 500, after: Optional[int] = None,
+                              before: Optional[int] = None, limit: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Page through archived submissions newest-first by created_utc"""
+        params = {'subreddit': subreddit, 'size': size, 'sort': 'desc', 'sort_type': 'created_utc'}
+        if after is not None:
+            params['after'] = after
+        if before is not None:
+            params['before'] = before
+        
+        fetched = 0
+        async for post in self._pushshift_paged('submission', params):
+            yield post
+            fetched += 1
+            if limit is not None and fetched >= limit:
+                return
+    
+    async def pushshift_fetch_comments(self, post_ids: List[str]) -> Dict[str, List[Comment]]:
+        """Fetch and filter comments for a batch of posts, grouped by post id
+        
+        Each post keeps its newest ``max_comments_per_post`` valid comments. Posts that
+        reach the cap are dropped from the query, and paging stops once all of them have.
+        """
+        max_comments = DATA_CONFIG['max_comments_per_post']
+        comments_by_post = {post_id: [] for post_id in post_ids}
+        open_posts = set(post_ids)
+        params = {
+            'link_id': ','.join(f"t3_{post_id}" for post_id in post_ids),
+            'size': PUSHSHIFT_CONFIG['page_size'],
+            'sort': 'desc',
+            'sort_type': 'created_utc'
+        }
+        
+        async for data in self._pushshift_paged('comment', params):
+            post_id = data.get('link_id', '')[3:]
+            if post_id not in open_posts or not self.is_valid_comment(data.get('body', ''), data.get('score', 0)):
+                continue
+            
+            comments = comments_by_post[post_id]
+            comments.append(self.comment_record(data))
+            if len(comments) >= max_comments:
+                open_posts.discard(post_id)
+                if not open_posts:
+                    break
+                # Narrow the remaining pages to posts that still need comments
+                params['link_id'] = ','.join(f"t3_{open_id}" for open_id in post_ids if open_id in open_posts)
+        
+        # Highest scored comments first, matching Reddit's default ordering
+        for comments in comments_by_post.values():
+            comments.sort(key=lambda c: c.score, reverse=True)
+        
+        return comments_by_post
+    
+    async def _pushshift_paged(self, kind: str, params: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Page through a newest-first archive search, yielding each object once
+        
+        Archives may cap ``size`` below the requested page size (PullPush allows 100), so
+        only an empty page ends the walk. Each page after the first starts at the oldest
+        second already seen, inclusive, so objects sharing that second are not skipped;
+        the ones already yielded are recognised by id.
+        
+        The cursor is written into `params` in place, so a caller may narrow the other
+        filters between pages.
+        """
+        boundary_second = None
+        boundary_ids = set()
+        
+        while True:
+            page = await self._pushshift_get(kind, params)
+            if not page:
+                return
+            
+            fresh = [item for item in page if item['id'] not in boundary_ids]
+            if not fresh:
+                # More objects share this second than one page holds; step past it
+                params['before'] = boundary_second
+                boundary_ids.clear()
+                continue
+            
+            for item in fresh:
+                yield item
+            
+            oldest = int(page[-1]['created_utc'])
+            if oldest != boundary_second:
+                boundary_second = oldest
+                boundary_ids.clear()
+            boundary_ids.update(item['id'] for item in page if int(item['created_utc']) == oldest)
+            params['before'] = oldest + 1
+    
+    async def _pushshift_get(self, kind: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Issue a single Pushshift search request within the archive's rate limit, retrying transient failures"""
+        url = f"{PUSHSHIFT_CONFIG['base_url']}/reddit/search/{kind}/"
+        
+        for attempt in range(DATA_CONFIG['retry_attempts'] + 1):
+            await self.pushshift_limiter.wait()
+            try:
+                async with self.http.get(url, params=params) as response:
+                    if response.status == 429 and attempt < DATA_CONFIG['retry_attempts']:
+                        # Throttled: wait as long as the archive asks before trying again
+                        delay = retry_after_seconds(response.headers, DATA_CONFIG['backoff_factor'] ** (attempt + 1))
+                        logger.debug(f"⏳ Pushshift throttled: sleeping {delay:.1f}s")
+                        await asyncio.sleep(delay)
+                        continue
+                    response.raise_for_status()
+                    payload = await response.json(content_type=None)
+                    return payload.get('data', [])
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == DATA_CONFIG['retry_attempts']:
+                    raise
+                await asyncio.sleep(DATA_CONFIG['backoff_factor'] ** attempt)
+    
+    def cached_comments(self, post: Dict[str, Any]) -> Optional[List[Comment]]:
+        """Return cached comments for a post unless it has gained comments since"""
+        payload = self.cache.get(f"comments/t3_{post['id']}")
+        if payload is None:
+            return None
+        
+        cached = self.cache_decoder.decode(payload)
+        if cached.num_comments == post['num_comments']:
+            self.extraction_stats['cache_hits'] += 1
+            return cached.comments
+        return None
+    
+    def cache_comments(self, post: Dict[str, Any], comments_data: List[Comment]):
+        """Cache a post's filtered comments as msgpack, keyed by its fullname"""
+        # An empty list may be a failed fetch, so only real results are cached
+        if comments_data:
+            cached = CachedComments(num_comments=post['num_comments'], comments=comments_data)
+            self.cache.set(f"comments/t3_{post['id']}", msgspec.msgpack.encode(cached))
+    
+    def post_content(self, post: Dict[str, Any]) -> str:
+        """Combine post title and body"""
+        return f"{post['title']}\n\n{post.get('selftext') or ''}".strip()
+    
+    def is_candidate_post(self, post: Dict[str, Any]) -> bool:
+        """Check post-level filters before any comments are fetched"""
+        if post['id'] in self.seen_posts:
+            # Already saved by an earlier run; resuming should not refetch its comments
+            self.extraction_stats['seen_posts_skipped'] += 1
+            return False
+        return (post.get('num_comments', 0) >= 2 and
+                post.get('score', 0) >= DATA_CONFIG['min_post_score'] and
+                len(self.post_content(post)) >= DATA_CONFIG['min_comment_length'])
+    
+    def is_valid_comment(self, body: str, score: int) -> bool:
+        """Check comment-level quality filters"""
+        return (body[:9] not in _DELETED_MARKERS and
+                len(body) >= DATA_CONFIG['min_comment_length'] and
+                len(body) <= DATA_CONFIG['max_comment_length'] and
+                score >= DATA_CONFIG['min_comment_score'])
+    
+    def comment_record(self, data: Dict[str, Any]) -> Comment:
+        """Build a comment record from Pushshift/Reddit JSON comment fields"""
+        parent_id = data.get('parent_id') or ''
+        return Comment(
+            comment_id=data['id'],
+            body=data['body'],
+            score=data.get('score', 0),
+            created_utc=data.get('created_utc'),
+            is_root=parent_id.startswith('t3_'),
+            parent_id=parent_id[3:] if parent_id.startswith('t1_') else None,
+            depth=data.get('depth', 0),
+            author=data.get('author') or '[deleted]'
+        )
+    
+    async def build_conversation(self, subreddit_name: str, post: Dict[str, Any],
+                                 comments_data: List[Comment]) -> Optional[ConversationData]:
+        """Build a conversation from a post and its filtered comments"""
+        if len(comments_data) < 2:  # Need at least 2 comments for conversation
+            return None
+        
+        # Extract empathy pairs
+        post_content = self.post_content(post)
+        # Scoring runs in a worker thread so the event loop keeps serving requests meanwhile
+        empathetic, embeddings = await asyncio.to_thread(self.score_empathy, [c.body for c in comments_data])
+        empathy_pairs = self.extract_empathy_pairs(post_content, comments_data, empathetic)
+        # Only responses that made it into pairs are checked against, and added to, the index
+        if empathy_pairs and embeddings is not None and self.dedup_index is not None:
+            empathy_pairs = await asyncio.to_thread(self.drop_near_duplicates, empathy_pairs,
+                                                    comments_data, embeddings)
+        if not empathy_pairs:  # Skip if no empathy detected
+            return None
+        
+        conversation = ConversationData(
+            subreddit=subreddit_name,
+            post_id=post['id'],
+            post_title=post['title'],
+            post_content=post_content,
+            post_score=post['score'],
+            comments=comments_data,
+            extracted_at=self.utc_now_iso(),
+            conversation_id=self.generate_conversation_id(subreddit_name, post['id']),
+            empathy_pairs=empathy_pairs,
+            metadata={
+                'num_comments': len(comments_data),
+                'empathy_pairs_count': len(empathy_pairs),
+                'post_created_utc': post['created_utc'],
+                'post_url': post.get('url'),
+                'submission_type': 'self' if post.get('is_self') else 'link'
+            }
+        )
+        
+        self.extraction_stats['total_posts_processed'] += 1
+        self.extraction_stats['empathy_pairs_found'] += len(empathy_pairs)
+        return conversation
+    
+    async def fetch_comments(self, subreddit_name: str, post_id: str) -> List[Comment]:
+        """Fetch a post's comment tree in one request and filter it"""
+        try:
+            client = self.reddit_client(subreddit_name)
+            _, comment_listing = await client.get(f"/r/{subreddit_name}/comments/{post_id}",
+                                                  {'limit': 500, 'depth': 10})
+            comments_data = list(self.iter_comments(comment_listing))
         except Exception as e:
             logger.warning(f"⚠️ Error extracting comments: {e}")
+            return []
         
+        self.extraction_stats['total_comments_extracted'] += len(comments_data)
         return comments_data
     
-    def save_batch_data(self, conversations: List[ConversationData], batch_num: int):
-        """Save batch data with compression"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Convert to dictionary format for JSON serialization
-        batch_data = []
+    def iter_comments(self, comment_listing: Dict[str, Any]) -> Iterator[Comment]:
+        """Yield the filtered comments of a fetched /comments/{id} listing"""
+        # Breadth-first walk over the returned tree, stopping after the first N comments.
+        # "Load more" placeholders are skipped, so no morechildren requests are issued.
+        queue = deque(comment_listing['data']['children'])
+        visited = 0
+        while queue and visited < DATA_CONFIG['max_comments_per_post']:
+            node = queue.popleft()
+            if node['kind'] == 'more':
+                continue
+            comment = node['data']
+            if comment.get('replies'):  # An empty string when there are no replies
+                queue.extend(comment['replies']['data']['children'])
+            visited += 1
+            
+            if self.is_valid_comment(comment['body'], comment['score']):
+                yield self.comment_record(comment)
+    
+    def _write_conversations(self, f, conversations: List[ConversationData]):
+        """Append conversations to an open JSONL stream"""
+        # Structs encode straight to JSON; the lines are written in one call
+        buffer = bytearray()
         for conv in conversations:
-            conv_dict = {
-                'conversation_id': conv.conversation_id,
-                'subreddit': conv.subreddit,
-                'post_id': conv.post_id,
-                'post_title': conv.post_title,
-                'post_content': conv.post_content,
-                'post_score': conv.post_score,
-                'comments': conv.comments,
-                'extracted_at': conv.extracted_at,
-                'empathy_pairs': conv.empathy_pairs,
-                'metadata': conv.metadata
-            }
-            batch_data.append(conv_dict)
+            self.encoder.encode_into(conv, buffer, -1)
+            buffer.extend(b'\n')
+        f.write(buffer)
+    
+    async def save_batch_data(self, writer_queue: asyncio.Queue, batch_num: int) -> Tuple[Optional[Path], int]:
+        """Stream conversations from the queue into a compressed JSONL batch file
         
-        # Save as compressed JSONL
-        output_file = Path(PATHS['raw_data']) / f"batch_{batch_num:03d}_{timestamp}.jsonl.gz"
+        Runs as a single writer task until it receives ``None``. Writes and the final
+        flush happen in a worker thread so compression overlaps with extraction, and the
+        task may keep flushing while the next batch is already being extracted.
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = Path(PATHS['raw_data']) / f"batch_{batch_num:03d}_{timestamp}.jsonl.zst"
+        post_ids = []
         
-        with gzip.open(output_file, 'wt', encoding='utf-8') as f:
-            for conv_dict in batch_data:
-                f.write(json.dumps(conv_dict, ensure_ascii=False) + '\n')
+        compressor = zstandard.ZstdCompressor(level=3, threads=-1)
+        f = compressor.stream_writer(open(output_file, 'wb'))
+        try:
+            while (conversations := await writer_queue.get()) is not None:
+                await asyncio.to_thread(self._write_conversations, f, conversations)
+                post_ids.extend(conv.post_id for conv in conversations)
+        finally:
+            # Ending the frame waits on the compression threads, so keep it off the loop
+            await asyncio.to_thread(f.close)
         
-        logger.info(f"💾 Batch {batch_num} saved: {len(batch_data)} conversations → {output_file}")
-        return output_file
+        if not post_ids:
+            output_file.unlink()
+            return None, 0
+        
+        # Only mark posts once the file is complete, so a crash mid-batch refetches them
+        await asyncio.to_thread(self.seen_posts.update, dict.fromkeys(post_ids, True))
+        written = len(post_ids)
+        logger.info(f"💾 Batch {batch_num} saved: {written} conversations → {output_file}")
+        return output_file, written
     
     def save_checkpoint(self):
-        """Save extraction checkpoint"""
+        """Save extraction checkpoint as msgpack of plain values"""
         checkpoint = {
             'extraction_stats': self.extraction_stats,
             'timestamp': datetime.now().isoformat(),
@@ -301,15 +916,15 @@ class GPURedditExtractor:
             'completed_subreddits': self.extraction_stats['subreddits_completed']
         }
         
-        checkpoint_file = Path(PATHS['checkpoints']) / f"extraction_checkpoint_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pkl"
+        checkpoint_file = Path(PATHS['checkpoints']) / f"extraction_checkpoint_{datetime.now().strftime('%Y%m%d_%H%M%S')}.msgpack"
         
         with open(checkpoint_file, 'wb') as f:
-            pickle.dump(checkpoint, f)
+            f.write(msgspec.msgpack.encode(checkpoint))
         
-        self.extraction_stats['last_checkpoint'] = checkpoint_file
+        self.extraction_stats['last_checkpoint'] = str(checkpoint_file)
         logger.info(f"💾 Checkpoint saved: {checkpoint_file}")
     
-    async def extract_all_data(self, subreddit_list: Optional[List[str]] = None) -> str:
+    async def extract_all_data(self, subreddit_list: Optional[Sequence[str]] = None) -> str:
         """Main extraction pipeline with GPU acceleration"""
         if subreddit_list is None:
             subreddit_list = EMPATHETIC_SUBREDDITS
@@ -320,40 +935,55 @@ class GPURedditExtractor:
         # Process in batches for memory efficiency
         batch_size = DATA_CONFIG['batch_size']
         all_output_files = []
+        pending_writes = []
         
-        for i in range(0, len(subreddit_list), batch_size):
-            batch_num = i // batch_size + 1
-            batch_subreddits = subreddit_list[i:i + batch_size]
-            
-            logger.info(f"📦 Processing batch {batch_num}/{(len(subreddit_list) + batch_size - 1) // batch_size}")
-            logger.info(f"📋 Subreddits: {', '.join(batch_subreddits)}")
-            
-            try:
-                # Extract batch data
-                batch_conversations = await self.extract_subreddit_batch(batch_subreddits)
+        try:
+            for i in range(0, len(subreddit_list), batch_size):
+                batch_num = i // batch_size + 1
+                batch_subreddits = subreddit_list[i:i + batch_size]
+                
+                logger.info(f"📦 Processing batch {batch_num}/{(len(subreddit_list) + batch_size - 1) // batch_size}")
+                logger.info(f"📋 Subreddits: {', '.join(batch_subreddits)}")
+                
+                try:
+                    # Extract batch data, saving conversations as each subreddit completes
+                    writer_queue = asyncio.Queue(maxsize=DATA_CONFIG['parallel_workers'])
+                    writer = asyncio.create_task(self.save_batch_data(writer_queue, batch_num))
+                    pending_writes.append(writer)
+                    try:
+                        await self.extract_subreddit_batch(batch_subreddits, writer_queue, writer)
+                    finally:
+                        # The writer finishes in the background while the next batch starts;
+                        # a writer that already died has nobody left to read the sentinel
+                        if not writer.done():
+                            await self.queue_for_writer(writer_queue, writer, None)
                 
-                if batch_conversations:
-                    # Save batch
-                    output_file = self.save_batch_data(batch_conversations, batch_num)
-                    all_output_files.append(output_file)
-                    
                     # Memory cleanup
-                    del batch_conversations
                     gc.collect()
                     if torch.cuda.is_available():
                         torch.cuda.empty_cache()
                 
-                # Save checkpoint every few batches
-                if batch_num % 3 == 0:
-                    self.save_checkpoint()
+                    # Save checkpoint every few batches
+                    if batch_num % 3 == 0:
+                        self.save_checkpoint()
                 
-                # Progress update
-                progress = (batch_num * batch_size) / len(subreddit_list) * 100
-                logger.info(f"📈 Overall progress: {progress:.1f}% complete")
+                    # Progress update
+                    progress = (batch_num * batch_size) / len(subreddit_list) * 100
+                    logger.info(f"📈 Overall progress: {progress:.1f}% complete")
                 
-            except Exception as e:
-                logger.error(f"❌ Batch {batch_num} failed: {e}")
-                continue
+                except Exception as e:
+                    logger.error(f"❌ Batch {batch_num} failed: {e}")
+                    continue
+        finally:
+            # Background writers still flushing earlier batches are finished even when
+            # extraction is interrupted, so their files are complete before any checkpoint
+            results = await asyncio.gather(*pending_writes, return_exceptions=True)
+        
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"❌ Batch save failed: {result}")
+            elif result[0]:
+                all_output_files.append(result[0])
         
         # Final summary
         total_time = datetime.now() - self.extraction_stats['start_time']
@@ -364,6 +994,9 @@ class GPURedditExtractor:
         logger.info(f"   - Comments extracted: {self.extraction_stats['total_comments_extracted']:,}")
         logger.info(f"   - Empathy pairs found: {self.extraction_stats['empathy_pairs_found']:,}")
         logger.info(f"   - Subreddits completed: {self.extraction_stats['subreddits_completed']}")
+        logger.info(f"   - Cache hits: {self.extraction_stats['cache_hits']:,}")
+        logger.info(f"   - Previously saved posts skipped: {self.extraction_stats['seen_posts_skipped']:,}")
+        logger.info(f"   - Near-duplicate responses skipped: {self.extraction_stats['near_duplicates_skipped']:,}")
         logger.info(f"   - Output files: {len(all_output_files)}")
         
         # Save final summary
@@ -387,29 +1020,31 @@ class GPURedditExtractor:
         
         summary_file = Path(PATHS['raw_data']) / f"extraction_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         
-        with open(summary_file, 'w') as f:
-            json.dump(summary, f, indent=2, default=str)
+        # msgspec encodes the start_time datetime natively, no default=str fallback needed
+        with open(summary_file, 'wb') as f:
+            f.write(msgspec.json.format(msgspec.json.encode(summary), indent=2))
         
         logger.info(f"📋 Extraction summary saved: {summary_file}")
         return str(summary_file)
 
 async def main():
     """Main execution function"""
-    extractor = GPURedditExtractor()
-    
-    try:
-        summary_file = await extractor.extract_all_data()
-        logger.info(f"✅ Data extraction pipeline completed successfully!")
-        logger.info(f"📄 Summary: {summary_file}")
-        
-    except KeyboardInterrupt:
-        logger.info("⚠️ Extraction interrupted by user")
-        extractor.save_checkpoint()
-        
-    except Exception as e:
-        logger.error(f"❌ Extraction failed: {e}")
-        extractor.save_checkpoint()
-        raise
+    async with GPURedditExtractor() as extractor:
+        try:
+            summary_file = await extractor.extract_all_data()
+            logger.info(f"✅ Data extraction pipeline completed successfully!")
+            logger.info(f"📄 Summary: {summary_file}")
+            
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            logger.info("⚠️ Extraction interrupted by user")
+            extractor.save_checkpoint()
+            
+        except Exception as e:
+            logger.error(f"❌ Extraction failed: {e}")
+            extractor.save_checkpoint()
+            raise
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     asyncio.run(main())
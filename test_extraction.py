@@ -23,9 +23,6 @@ async def test_extraction():
     logger.info("🧪 Starting test extraction...")
     
     try:
-        # Initialize extractor
-        extractor = GPURedditExtractor()
-        
         # Test with a small subset of subreddits
         test_subreddits = [
             'CasualConversation',
@@ -40,8 +37,9 @@ async def test_extraction():
         original_posts = DATA_CONFIG['posts_per_subreddit']
         DATA_CONFIG['posts_per_subreddit'] = 10  # Small test
         
-        # Run extraction
-        summary_file = await extractor.extract_all_data(test_subreddits)
+        # Initialize extractor and run extraction
+        async with GPURedditExtractor() as extractor:
+            summary_file = await extractor.extract_all_data(test_subreddits)
         
         # Restore original configuration
         DATA_CONFIG['posts_per_subreddit'] = original_posts
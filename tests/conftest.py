@@ -0,0 +1,54 @@
+"""
+Shared test setup: import paths and stubbed HTTP sessions for the extractor
+"""
+
+import sys
+from pathlib import Path
+
+import aiohttp
+from multidict import CIMultiDict
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'src'))
+
+from config.settings import LOGGING_CONFIG
+
+# The extractor attaches a file handler at import time
+Path(LOGGING_CONFIG['log_file']).parent.mkdir(parents=True, exist_ok=True)
+
+
+class FakeResponse:
+    """Just enough of aiohttp.ClientResponse for the extractor's request helpers"""
+
+    def __init__(self, payload=None, status=200, headers=None):
+        self.payload = payload
+        self.status = status
+        self.headers = CIMultiDict(headers or {})
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(None, (), status=self.status, headers=self.headers)
+
+    async def json(self, content_type=None):
+        return self.payload
+
+
+class FakeSession:
+    """Stands in for aiohttp.ClientSession, answering GETs from a handler"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+
+    def get(self, url, params=None, **kwargs):
+        # Copy, since callers reuse and mutate their params between pages
+        params = dict(params or {})
+        self.requests.append((url, params))
+        return self.handler(url, params)
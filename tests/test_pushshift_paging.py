@@ -0,0 +1,131 @@
+"""
+Tests for archive paging: short pages, boundary-second ties and 429 handling
+"""
+
+import asyncio
+
+import pytest
+
+import gpu_reddit_extractor
+from gpu_reddit_extractor import GPURedditExtractor, RateLimiter
+from conftest import FakeResponse, FakeSession
+
+ARCHIVE_SIZE_CAP = 100  # PullPush returns at most 100 objects per request
+
+
+def archive(objects, size_cap=ARCHIVE_SIZE_CAP):
+    """Handler answering search requests newest-first, like a Pushshift-compatible archive"""
+    def handler(url, params):
+        matches = [obj for obj in objects if obj['created_utc'] < params.get('before', float('inf'))]
+        if 'link_id' in params:
+            link_ids = set(params['link_id'].split(','))
+            matches = [obj for obj in matches if obj['link_id'] in link_ids]
+        matches.sort(key=lambda obj: obj['created_utc'], reverse=True)
+        return FakeResponse({'data': matches[:min(params['size'], size_cap)]})
+    return handler
+
+
+def make_extractor(handler) -> GPURedditExtractor:
+    """An extractor wired only with what the archive helpers use"""
+    extractor = object.__new__(GPURedditExtractor)
+    extractor.http = FakeSession(handler)
+    extractor.pushshift_limiter = RateLimiter(max_requests=10_000, window_seconds=60, reserve=0)
+    return extractor
+
+
+def collect(extractor, kind='submission', **params):
+    async def run():
+        query = {'size': 500, 'sort': 'desc', 'sort_type': 'created_utc', **params}
+        return [obj async for obj in extractor._pushshift_paged(kind, query)]
+    return asyncio.run(run())
+
+
+def test_paging_continues_past_capped_pages():
+    objects = [{'id': f"p{i}", 'created_utc': 1_000 + i} for i in range(350)]
+    extractor = make_extractor(archive(objects))
+
+    ids = [obj['id'] for obj in collect(extractor)]
+
+    # Every page comes back shorter than the 500 asked for; only the empty one ends paging
+    assert sorted(ids) == sorted(obj['id'] for obj in objects)
+    assert extractor.http.requests[-1][1]['before'] <= 1_000
+
+
+def test_paging_keeps_objects_sharing_the_boundary_second():
+    # 30 objects per second, so every page of 100 ends partway through a second
+    objects = [{'id': f"p{i}", 'created_utc': 1_000 + i // 30} for i in range(300)]
+    extractor = make_extractor(archive(objects))
+
+    ids = [obj['id'] for obj in collect(extractor)]
+
+    assert len(ids) == len(set(ids))
+    assert set(ids) == {obj['id'] for obj in objects}
+
+
+def test_paging_steps_past_a_second_fuller_than_a_page():
+    crowded = [{'id': f"c{i}", 'created_utc': 2_000} for i in range(150)]
+    older = [{'id': f"o{i}", 'created_utc': 1_000 + i} for i in range(50)]
+    extractor = make_extractor(archive(crowded + older))
+
+    ids = [obj['id'] for obj in collect(extractor)]
+
+    # The crowded second cannot be paged within, but paging must not loop on it
+    assert len(ids) == len(set(ids))
+    assert {obj['id'] for obj in older} <= set(ids)
+
+
+def test_paging_respects_the_initial_before_bound():
+    objects = [{'id': f"p{i}", 'created_utc': 1_000 + i} for i in range(300)]
+    extractor = make_extractor(archive(objects))
+
+    created = [obj['created_utc'] for obj in collect(extractor, before=1_150)]
+
+    assert len(created) == 150
+    assert max(created) < 1_150
+
+
+def test_comment_paging_stops_at_the_per_post_cap(monkeypatch):
+    monkeypatch.setitem(gpu_reddit_extractor.DATA_CONFIG, 'max_comments_per_post', 20)
+    body = "I am so sorry you are going through this, it sounds really hard."
+    objects = [
+        {'id': f"{post}{i}", 'link_id': f"t3_{post}", 'body': body, 'score': 5,
+         'created_utc': 1_000 + i, 'parent_id': f"t3_{post}"}
+        for post, count in (('a', 500), ('b', 10))
+        for i in range(count)
+    ]
+    extractor = make_extractor(archive(objects))
+
+    comments = asyncio.run(extractor.pushshift_fetch_comments(['a', 'b']))
+
+    assert len(comments['a']) == 20
+    assert len(comments['b']) == 10
+    # Once 'a' is full only 'b' is queried, instead of paging through all of 'a'
+    assert len(extractor.http.requests) < 500 // ARCHIVE_SIZE_CAP
+    assert extractor.http.requests[-1][1]['link_id'] == 't3_b'
+
+
+def test_throttled_request_sleeps_for_retry_after(monkeypatch):
+    responses = [FakeResponse(status=429, headers={'Retry-After': '7'}),
+                 FakeResponse({'data': [{'id': 'p1', 'created_utc': 1_000}]})]
+    extractor = make_extractor(lambda url, params: responses.pop(0))
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+    monkeypatch.setattr(gpu_reddit_extractor.asyncio, 'sleep', fake_sleep)
+
+    page = asyncio.run(extractor._pushshift_get('submission', {'size': 100}))
+
+    assert page == [{'id': 'p1', 'created_utc': 1_000}]
+    assert delays == [7.0]
+
+
+def test_throttling_that_persists_raises(monkeypatch):
+    extractor = make_extractor(lambda url, params: FakeResponse(status=429))
+
+    async def fake_sleep(delay):
+        pass
+    monkeypatch.setattr(gpu_reddit_extractor.asyncio, 'sleep', fake_sleep)
+
+    with pytest.raises(gpu_reddit_extractor.aiohttp.ClientResponseError):
+        asyncio.run(extractor._pushshift_get('submission', {'size': 100}))
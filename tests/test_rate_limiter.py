@@ -0,0 +1,116 @@
+"""
+Tests for rate limiting driven by Reddit's X-Ratelimit-* and Retry-After headers
+"""
+
+import asyncio
+import time
+from email.utils import formatdate
+
+import pytest
+from multidict import CIMultiDict
+
+import gpu_reddit_extractor
+from gpu_reddit_extractor import RateLimiter, RedditClient, retry_after_seconds
+from conftest import FakeResponse, FakeSession
+
+
+def test_update_reads_ratelimit_headers():
+    limiter = RateLimiter(max_requests=100, window_seconds=60, reserve=5)
+
+    limiter.update(CIMultiDict({'X-Ratelimit-Remaining': '42.0', 'X-Ratelimit-Reset': '30'}))
+
+    assert limiter.remaining == 42.0
+    assert limiter.reset_timestamp == pytest.approx(time.time() + 30, abs=1)
+
+
+def test_update_ignores_responses_without_ratelimit_headers():
+    limiter = RateLimiter(max_requests=100, window_seconds=60, reserve=5)
+    limiter.update(CIMultiDict({'X-Ratelimit-Remaining': '42', 'X-Ratelimit-Reset': '30'}))
+
+    limiter.update(CIMultiDict({'X-Ratelimit-Remaining': '7'}))
+
+    assert limiter.remaining == 42.0
+
+
+def test_spare_quota_needs_no_wait():
+    limiter = RateLimiter(max_requests=100, window_seconds=60, reserve=5)
+    limiter.update(CIMultiDict({'X-Ratelimit-Remaining': '50', 'X-Ratelimit-Reset': '60'}))
+
+    assert limiter.time_until_next_request() == 0.0
+
+
+def test_reserve_spreads_remaining_quota_until_reset():
+    limiter = RateLimiter(max_requests=100, window_seconds=60, reserve=5)
+    limiter.update(CIMultiDict({'X-Ratelimit-Remaining': '4', 'X-Ratelimit-Reset': '40'}))
+
+    assert limiter.time_until_next_request() == pytest.approx(10, abs=0.5)
+
+
+def test_exhausted_quota_waits_for_reset():
+    limiter = RateLimiter(max_requests=100, window_seconds=60, reserve=5)
+    limiter.update(CIMultiDict({'X-Ratelimit-Remaining': '0', 'X-Ratelimit-Reset': '20'}))
+
+    assert limiter.time_until_next_request() == pytest.approx(20, abs=0.5)
+
+
+def test_full_window_waits_for_oldest_request_to_age_out():
+    limiter = RateLimiter(max_requests=3, window_seconds=60, reserve=0)
+    now = time.monotonic()
+    limiter.request_times.extend([now - 45, now - 10, now - 5])
+
+    assert limiter.time_until_next_request() == pytest.approx(15, abs=0.5)
+
+
+def test_requests_older_than_the_window_are_dropped():
+    limiter = RateLimiter(max_requests=2, window_seconds=60, reserve=0)
+    now = time.monotonic()
+    limiter.request_times.extend([now - 120, now - 90, now - 5])
+
+    assert limiter.time_until_next_request() == 0.0
+    assert len(limiter.request_times) == 1
+
+
+def test_wait_sleeps_then_records_the_request(monkeypatch):
+    limiter = RateLimiter(max_requests=100, window_seconds=60, reserve=5)
+    limiter.update(CIMultiDict({'X-Ratelimit-Remaining': '2', 'X-Ratelimit-Reset': '10'}))
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+    monkeypatch.setattr(gpu_reddit_extractor.asyncio, 'sleep', fake_sleep)
+
+    asyncio.run(limiter.wait())
+
+    assert delays == [pytest.approx(5, abs=0.5)]
+    assert len(limiter.request_times) == 1
+
+
+def test_client_feeds_response_headers_to_its_limiter():
+    headers = {'X-Ratelimit-Remaining': '12', 'X-Ratelimit-Reset': '300'}
+    client = object.__new__(RedditClient)
+    client.session = FakeSession(lambda url, params: FakeResponse({'data': {}}, headers=headers))
+    client.rate_limiter = RateLimiter(max_requests=100, window_seconds=60, reserve=5)
+    client.token = 'token'
+    client.token_expires_at = float('inf')
+
+    asyncio.run(client.get('/r/test/about'))
+
+    assert client.rate_limiter.remaining == 12.0
+    assert client.session.requests[0][1]['raw_json'] == 1
+
+
+@pytest.mark.parametrize('headers, expected', [
+    ({'Retry-After': '12'}, 12.0),
+    ({'retry-after': '2.5'}, 2.5),
+    ({'Retry-After': '-3'}, 0.0),
+    ({'Retry-After': 'soon'}, 4.0),
+    ({}, 4.0),
+])
+def test_retry_after_seconds(headers, expected):
+    assert retry_after_seconds(CIMultiDict(headers), default=4.0) == expected
+
+
+def test_retry_after_accepts_an_http_date():
+    headers = CIMultiDict({'Retry-After': formatdate(time.time() + 30, usegmt=True)})
+
+    assert retry_after_seconds(headers, default=4.0) == pytest.approx(30, abs=1.5)